@@ -0,0 +1,67 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Benchmark: build time, memory and lookup throughput of the IntervalTree, flat and binned indexes.
+
+Usage: python benchmarks/index_benchmark.py [chain_file]
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from pyliftover import LiftOver
+
+DEFAULT_CHAIN_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'tests', 'data', 'hg17ToHg18.over.chain.gz')
+
+
+def best_time(f, repeat=3):
+    best = float('inf')
+    for i in range(repeat):
+        t = time.time()
+        f()
+        best = min(best, time.time() - t)
+    return best
+
+
+def main(chain_file=DEFAULT_CHAIN_FILE, n_queries=200000):
+    lo = LiftOver(chain_file)
+    random.seed(1)
+    chains = lo.chain_file.chains
+    queries = []
+    for i in range(n_queries):
+        c = random.choice(chains)  # Positions within the chains, so that most of the lookups hit a block
+        queries.append((c.source_name, random.randint(c.source_start, c.source_end)))
+    id_queries = [(lo.chromosome_id(chromosome), position) for (chromosome, position) in queries]
+    print("%-8s %10s %12s %18s %18s" % ('index', 'build, s', 'memory, MB', 'single, queries/s', 'batch, queries/s'))
+    for index_type in ['tree', 'flat', 'binned']:
+        cf = LiftOver(chain_file).chain_file
+        base_memory = cf.memory_usage()
+        if index_type == 'tree':
+            build = 0.0
+            query_id = cf.query_id
+            memory = base_memory
+        else:
+            t = time.time()
+            index = cf.block_index(index_type)
+            build = time.time() - t
+            query_id = index.query
+            memory = cf.memory_usage() - base_memory
+        single = best_time(lambda: [cf.query(chromosome, position) for (chromosome, position) in queries])
+        batch = best_time(lambda: [query_id(chrom_id, position) for (chrom_id, position) in id_queries])
+        if index_type != 'tree':
+            # Single queries go through LiftOverChainFile.query with the given index type
+            cf = LiftOver(chain_file, index=index_type).chain_file
+            single = best_time(lambda: [cf.query(chromosome, position) for (chromosome, position) in queries])
+        print("%-8s %10.2f %12.1f %18.0f %18.0f" % (index_type, build, memory / 1048576.0, n_queries / single, n_queries / batch))
+    print("(memory for 'tree' is the whole chain file, for others - the extra memory of the index)")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
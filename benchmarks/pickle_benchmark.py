@@ -0,0 +1,54 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Benchmark: payload size and round-trip time of pickling a LiftOver object.
+
+Compares the compact columnar pickling of LiftOver with the default pickling of the same
+data (the chain list together with the recursive interval tree index), as done before it was introduced.
+
+Usage: python benchmarks/pickle_benchmark.py [chain_file]
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from pyliftover import LiftOver
+
+DEFAULT_CHAIN_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'tests', 'data', 'hg17ToHg18.over.chain.gz')
+
+
+def measure(obj, repeat=3):
+    '''
+    Returns (payload size, best dumps time, best loads time).
+    '''
+    dump_times, load_times = [], []
+    for i in range(repeat):
+        t = time.time()
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        dump_times.append(time.time() - t)
+        t = time.time()
+        pickle.loads(data)
+        load_times.append(time.time() - t)
+    return len(data), min(dump_times), min(load_times)
+
+
+def main(chain_file=DEFAULT_CHAIN_FILE):
+    t = time.time()
+    lo = LiftOver(chain_file)
+    print("Loading %s: %.2fs" % (os.path.basename(chain_file), time.time() - t))
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+    default = (lo.chain_file.chains, lo.chain_file.chain_index)
+    for (label, obj) in [('default pickling', default), ('compact pickling', lo)]:
+        size, dump_time, load_time = measure(obj)
+        print("%-18s %10.1f KB   dumps %.3fs   loads %.3fs   round-trip %.3fs" % (label, size / 1024.0, dump_time, load_time, dump_time + load_time))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
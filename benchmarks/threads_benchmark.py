@@ -0,0 +1,46 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Benchmark: throughput of LiftOver.convert_many depending on the number of threads.
+
+On GIL-enabled CPython builds the throughput is expected to stay flat, while on free-threaded builds
+(python3.13t and later) it should grow with the number of threads, as the FlatIndex requires no locking.
+
+Usage: python benchmarks/threads_benchmark.py [chain_file]
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from pyliftover import LiftOver
+
+DEFAULT_CHAIN_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'tests', 'data', 'hg17ToHg18.over.chain.gz')
+
+
+def main(chain_file=DEFAULT_CHAIN_FILE, n_queries=400000):
+    lo = LiftOver(chain_file)
+    random.seed(1)
+    chromosomes = sorted(lo.chain_file.chain_index.keys())
+    queries = [(random.choice(chromosomes), random.randint(0, 150000000)) for i in range(n_queries)]
+    lo.convert_many(queries[:10])  # Build the flat index
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print("Python %s, GIL %s" % (sys.version.split()[0], 'enabled' if gil else 'disabled'))
+    t = time.time()
+    for q in queries:
+        lo.convert_coordinate(*q)
+    print("%-22s %10.0f queries/s" % ('convert_coordinate', n_queries / (time.time() - t)))
+    for threads in [1, 2, 4, 8]:
+        t = time.time()
+        lo.convert_many(queries, threads=threads)
+        print("%-22s %10.0f queries/s" % ('convert_many, %d thr.' % threads, n_queries / (time.time() - t)))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,10 @@
+'''
+pytest configuration: modules which can not be imported on the running interpreter are excluded from doctest collection.
+'''
+
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append('pyliftover/server.py')  # Uses ThreadingHTTPServer and the Python 3 standard library layout
+    collect_ignore.append('pyliftover/aio.py')  # Uses async def and asyncio.get_running_loop
@@ -0,0 +1,15 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Allows running the command-line interface as "python -m pyliftover".
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import sys
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+asyncio facade for LiftOver, for use in event-loop based services.
+
+Usage::
+
+    from pyliftover.aio import AsyncLiftOver
+    lo = await AsyncLiftOver.create('hg17ToHg18.over.chain.gz')
+    await lo.aconvert('chr1', 1000000)
+    await lo.aconvert_many([('chr1', 1000000), ('chr2', 2000000, '-')])
+
+Requires Python 3.7+.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import asyncio
+import functools
+
+from .liftover import LiftOver
+
+
+class AsyncLiftOver:
+    '''
+    Wraps a :class:`pyliftover.liftover.LiftOver` object so that it can be used from coroutines
+    without stalling the event loop.
+
+    Single conversions and batches of at most inline_threshold queries take microseconds and are answered inline.
+    Larger batches are split into chunks of chunk_size queries, which are converted one after another in the given
+    executor (by default, the event loop's default executor). The event loop serves other coroutines while a chunk
+    is being converted, so that large requests do not affect the latency of unrelated ones.
+
+    The wrapped LiftOver object is available as the ``lo`` attribute.
+    '''
+
+    def __init__(self, lo, executor=None, chunk_size=5000, inline_threshold=200):
+        self.lo = lo
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.inline_threshold = inline_threshold
+
+    @classmethod
+    async def create(cls, *args, executor=None, chunk_size=5000, inline_threshold=200, **kwargs):
+        '''
+        Loads the chain file in the executor (see :class:`pyliftover.liftover.LiftOver` for the arguments)
+        and returns the resulting AsyncLiftOver object.
+        The block index used by batch conversions is built in the executor as well, so that the first inline batch does not have to build it.
+        '''
+        loop = asyncio.get_running_loop()
+        lo = await loop.run_in_executor(executor, functools.partial(cls._load, *args, **kwargs))
+        return cls(lo, executor=executor, chunk_size=chunk_size, inline_threshold=inline_threshold)
+
+    @staticmethod
+    def _load(*args, **kwargs):
+        lo = LiftOver(*args, **kwargs)
+        lo.chain_file.block_index()
+        return lo
+
+    async def aconvert(self, chromosome, position, strand='+'):
+        '''
+        Same as :meth:`pyliftover.liftover.LiftOver.convert_coordinate`.
+        '''
+        return self.lo.convert_coordinate(chromosome, position, strand)
+
+    async def aconvert_region(self, chromosome, start, end, strand='+'):
+        '''
+        Same as :meth:`pyliftover.liftover.LiftOver.convert_region`.
+        '''
+        return self.lo.convert_region(chromosome, start, end, strand)
+
+    async def aconvert_many(self, queries):
+        '''
+        Same as :meth:`pyliftover.liftover.LiftOver.convert_many`.
+        Large batches are converted in chunks in the executor, yielding control to the event loop between them.
+        '''
+        return await self._batched(self.lo.convert_many, queries)
+
+    async def anearest_mapped_many(self, queries):
+        '''
+        Same as :meth:`pyliftover.liftover.LiftOver.nearest_mapped_many`, batched like :meth:`aconvert_many`.
+        '''
+        return await self._batched(self.lo.nearest_mapped_many, queries)
+
+    async def _batched(self, method, queries):
+        if not isinstance(queries, list):
+            queries = list(queries)
+        if len(queries) <= self.inline_threshold:
+            return method(queries)
+        loop = asyncio.get_running_loop()
+        results = []
+        for i in range(0, len(queries), self.chunk_size):
+            results.extend(await loop.run_in_executor(self.executor, method, queries[i:i + self.chunk_size]))
+        return results
@@ -10,15 +10,29 @@ Licensed under MIT license.
 
 import os.path
 import gzip
+import re
 import urllib
 import shutil
 import sys
+import threading
+from array import array
 
 from .intervaltree import IntervalTree
+from .chromosomes import ChromosomeDictionary
+from .regions import RegionSet, read_bed, string_types
+from .flatindex import FlatIndex, BinnedIndex
+from .memory import deep_sizeof
+from .mask import MappabilityMask
 
 if sys.version_info >= (3, 0):
     import urllib.request
 
+# Guards the lazy construction of the derived indexes of LiftOverChainFile objects.
+_build_lock = threading.Lock()
+
+# Alternatives to the default IntervalTree-based index (see LiftOverChainFile.block_index)
+BLOCK_INDEX_TYPES = {'flat': FlatIndex, 'binned': BinnedIndex}
+
 if sys.version_info < (3, 3):
     FancyURLopener = urllib.FancyURLopener if sys.version_info < (3, 0) else urllib.request.FancyURLopener
 
@@ -99,7 +113,7 @@ class LiftOverChainFile:
     Specification of the chain format can be found here: http://genome.ucsc.edu/goldenPath/help/chain.html
     '''
     
-    def __init__(self, f, show_progress=False):
+    def __init__(self, f, show_progress=False, aliases=None, min_score=None, source_chromosomes=None, target_chromosomes=None, regions=None, index='tree'):
         '''
         Reads chain data from the file and initializes an interval index.
         f must be a file object open for reading.
@@ -107,14 +121,34 @@ class LiftOverChainFile:
         
         If show_progress == True, a progress bar is shown in the console.
         Requires tqdm to be installed.
+
+        All source and target chromosome names are registered in a :class:`ChromosomeDictionary` (self.chromosomes),
+        which assigns them compact integer ids. Queries by id (see :meth:`query_id`) avoid any name handling.
+        If aliases is provided, the source chromosomes may also be queried by alternative names.
+        aliases may be True (conventional UCSC/Ensembl variants, e.g. "1" for "chr1" or "MT" for "chrM"),
+        or a dict: alias --> chromosome name (e.g. as read from UCSC's chromAlias.txt by :func:`pyliftover.chromosomes.read_chrom_alias`).
+
+        The remaining parameters restrict the set of loaded chains (see :class:`ChainFilter`).
+        Chains and alignment blocks which are filtered out are skipped while reading and never make it into memory.
+
+        The index parameter selects the index used by :meth:`query` and :meth:`query_id`: 'tree' (per-chromosome IntervalTrees, the default),
+        'flat' (:class:`pyliftover.flatindex.FlatIndex`) or 'binned' (:class:`pyliftover.flatindex.BinnedIndex`).
+        The IntervalTrees are built in any case, as they are available to the users as self.chain_index.
         '''
-        self.chains = self._load_chains(f, show_progress)
+        if index != 'tree' and index not in BLOCK_INDEX_TYPES:
+            raise ValueError("Unknown index type: %s" % index)
+        chain_filter = ChainFilter(min_score, source_chromosomes, target_chromosomes, regions)
+        self.chains = self._load_chains(f, show_progress, chain_filter if chain_filter.active else None)
         self.chain_index = self._index_chains(self.chains, show_progress)
+        self.chromosomes, self.source_index = self._index_chromosomes(self.chains, self.chain_index, aliases)
+        self._init_block_indexes(index)
+        self._mask = None
         
     @staticmethod
-    def _load_chains(f, show_progress=False):
+    def _load_chains(f, show_progress=False, chain_filter=None):
         '''
         Loads all LiftOverChain objects from a file into an array. Returns the result.
+        If a ChainFilter is given, only the chains (and blocks) accepted by it are loaded.
         '''
         chains = []
         if show_progress:
@@ -127,8 +161,15 @@ class LiftOverChainFile:
             if line.startswith(b'#') or line.startswith(b'\n') or line.startswith(b'\r'):
                 continue
             if line.startswith(b'chain'):
-                # Read chain
-                chains.append(LiftOverChain(line, f))
+                if chain_filter is None:
+                    # Read chain
+                    chains.append(LiftOverChain(line, f))
+                elif not chain_filter.accepts_header(line):
+                    LiftOverChain.skip_blocks(f)
+                else:
+                    chain = LiftOverChain(line, f, chain_filter.regions)
+                    if chain.blocks:
+                        chains.append(chain)
                 if show_progress:
                     pbar.update(1)
                 continue
@@ -169,6 +210,199 @@ class LiftOverChainFile:
             chain_index[k].sort()
         return chain_index
 
+    @staticmethod
+    def _index_chromosomes(chains, chain_index, aliases=None):
+        '''
+        Given a list of LiftOverChain objects and the corresponding chain index,
+        creates a ChromosomeDictionary of all source and target chromosome names
+        and a list: source_id --> IntervalTree (None for chromosomes which are only present as targets).
+        Chain names are replaced with the (interned) names from the dictionary.
+        Returns the pair (dictionary, list).
+        '''
+        chromosomes = ChromosomeDictionary()
+        for c in chains:
+            c.source_name = chromosomes.name(chromosomes.add(c.source_name))
+            c.target_name = chromosomes.name(chromosomes.add(c.target_name))
+        if aliases:
+            chromosomes.add_aliases(aliases)
+        source_index = [chain_index.get(name) for name in chromosomes]
+        return chromosomes, source_index
+
+    def __getstate__(self):
+        '''
+        Pickling support. Instead of walking the interval trees and thousands of chain objects,
+        the chains are stored as a handful of flat columns (mostly arrays), and the index is rebuilt on unpickling.
+        '''
+        chains, chromosomes = self.chains, self.chromosomes
+        names = chromosomes.names
+        aliases = dict((alias, names[i]) for (alias, i) in chromosomes.ids.items() if alias != names[i])
+        blocks = [b for c in chains for b in c.blocks]
+        return {
+            'names': names,
+            'aliases': aliases,
+            'score': [c.score for c in chains],  # Scores may exceed the range of a C long, hence a list
+            'source_id': array('l', [chromosomes.resolve(c.source_name) for c in chains]),
+            'source_start': array('l', [c.source_start for c in chains]),
+            'source_end': array('l', [c.source_end for c in chains]),
+            'target_id': array('l', [chromosomes.resolve(c.target_name) for c in chains]),
+            'target_strand': ''.join(c.target_strand for c in chains),
+            'target_start': array('l', [c.target_start for c in chains]),
+            'target_end': array('l', [c.target_end for c in chains]),
+            'size': array('l', [c.source_size for c in chains] + [c.target_size for c in chains]),
+            'id': [c.id for c in chains],
+            'block_count': array('l', [len(c.blocks) for c in chains]),
+            'block_source_from': array('l', [b[0] for b in blocks]),
+            'block_source_to': array('l', [b[1] for b in blocks]),
+            'block_target_from': array('l', [b[2] for b in blocks]),
+            'index_type': self.index_type,
+            'mask': self._mask,  # Cached with the chains, if it was built
+        }
+
+    def __setstate__(self, state):
+        names = state['names']
+        n = len(state['score'])
+        sizes = state['size']
+        sfrom, sto, tfrom = state['block_source_from'], state['block_source_to'], state['block_target_from']
+        chains = []
+        offset = 0
+        for i in range(n):
+            c = LiftOverChain.__new__(LiftOverChain)
+            c.score = state['score'][i]
+            c.source_name = names[state['source_id'][i]]
+            c.source_size = sizes[i]
+            c.source_start = state['source_start'][i]
+            c.source_end = state['source_end'][i]
+            c.target_name = names[state['target_id'][i]]
+            c.target_size = sizes[n + i]
+            c.target_strand = state['target_strand'][i]
+            c.target_start = state['target_start'][i]
+            c.target_end = state['target_end'][i]
+            c.id = state['id'][i]
+            end = offset + state['block_count'][i]
+            c.blocks = list(zip(sfrom[offset:end], sto[offset:end], tfrom[offset:end]))
+            offset = end
+            chains.append(c)
+        self.chains = chains
+        self.chain_index = self._index_chains(chains)
+        self.chromosomes, self.source_index = self._index_chromosomes(chains, self.chain_index, state['aliases'] or None)
+        self._init_block_indexes(state['index_type'])
+        self._mask = state.get('mask')
+
+    def _init_block_indexes(self, index_type):
+        self.index_type = index_type
+        self._block_indexes = {}
+        self._query_index = None if index_type == 'tree' else self.block_index(index_type)
+
+    def block_index(self, index_type=None):
+        '''
+        Returns a read-only :class:`pyliftover.flatindex.FlatIndex` (index_type='flat') or :class:`pyliftover.flatindex.BinnedIndex`
+        (index_type='binned') of the chains, which can be shared across threads.
+        By default, the index type chosen at construction is used, or 'flat' if it was 'tree'.
+        The index is built on first use (exactly once, even if requested concurrently from several threads).
+        '''
+        if index_type is None:
+            index_type = 'flat' if self.index_type == 'tree' else self.index_type
+        if index_type not in BLOCK_INDEX_TYPES:
+            raise ValueError("Unknown index type: %s" % index_type)
+        index = self._block_indexes.get(index_type)
+        if index is None:
+            with _build_lock:
+                index = self._block_indexes.get(index_type)
+                if index is None:
+                    index = BLOCK_INDEX_TYPES[index_type](self)
+                    self._block_indexes[index_type] = index
+        return index
+
+    def mappability_mask(self):
+        '''
+        Returns the :class:`pyliftover.mask.MappabilityMask` of the source chromosomes.
+        The mask is built on first use (exactly once, even if requested concurrently from several threads)
+        and is pickled along with the chains after that.
+        '''
+        if self._mask is None:
+            with _build_lock:
+                if self._mask is None:
+                    self._mask = MappabilityMask(self)
+        return self._mask
+
+    def memory_usage(self):
+        '''
+        Returns the total number of bytes used by the loaded chains and all the indexes built for them.
+        '''
+        return deep_sizeof(self)
+
+    def describe(self):
+        '''
+        Reports the memory footprint of the loaded chain file. Returns a dict with two keys:
+         * 'chromosomes': a dict: source chromosome name --> statistics for the chains of that chromosome,
+         * 'total': statistics for the whole chain file.
+        The statistics are dicts with the following keys:
+         * chains, blocks: number of chains and alignment blocks,
+         * tree_nodes, mid_entries, duplicated_mid_entries: see :meth:`pyliftover.intervaltree.IntervalTree.describe`,
+         * bytes: memory used by the chains and their interval tree. For the total, this also includes
+           the chromosome dictionary and any additional indexes (such as the flat index), i.e. it equals :meth:`memory_usage`.
+
+        >>> cf = LiftOverChainFile(open('tests/data/mds42.to.mg1655.liftOver', 'rb'))
+        >>> d = cf.describe()
+        >>> sorted(d['chromosomes']), d['total']['chains'], d['total']['blocks'] == len(cf.chains[0].blocks)
+        (['AP012306.1'], 1, True)
+        >>> d['chromosomes']['AP012306.1']['bytes'] < d['total']['bytes'] == cf.memory_usage()
+        True
+        '''
+        keys = ['chains', 'blocks', 'tree_nodes', 'mid_entries', 'duplicated_mid_entries', 'bytes']
+        # Chromosome names are shared by all chains, do not attribute them to any chromosome
+        seen = set()
+        deep_sizeof(self.chromosomes, seen)
+        chains_by_source = {}
+        for c in self.chains:
+            chains_by_source.setdefault(c.source_name, []).append(c)
+        chromosomes = {}
+        for name, tree in self.chain_index.items():
+            tree_stats = tree.describe()
+            chains = chains_by_source.get(name, [])
+            chromosomes[name] = {
+                'chains': len(chains),
+                'blocks': sum(len(c.blocks) for c in chains),
+                'tree_nodes': tree_stats['nodes'],
+                'mid_entries': tree_stats['mid_entries'],
+                'duplicated_mid_entries': tree_stats['duplicated_mid_entries'],
+                'bytes': deep_sizeof(chains, seen) + tree.memory_usage(seen),
+            }
+        total = dict((k, sum(stats[k] for stats in chromosomes.values())) for k in keys)
+        total['bytes'] = self.memory_usage()
+        return {'chromosomes': chromosomes, 'total': total}
+
+    def write(self, f):
+        '''
+        Writes all chains in the standard .over.chain format to a file object open for writing in binary mode.
+        When the chain file was loaded with a region filter, this produces a subset of the original chain file,
+        which gives the same conversions within the regions.
+        '''
+        for c in self.chains:
+            c.write(f)
+
+    def chromosome_id(self, chromosome):
+        '''
+        Returns the id of a source chromosome name (or its alias), to be used with :meth:`query_id`.
+        If the chromosome is not a known source chromosome, returns None.
+        '''
+        chrom_id = self.chromosomes.resolve(chromosome)
+        if chrom_id is None or self.source_index[chrom_id] is None:
+            return None
+        return chrom_id
+
+    def query_id(self, chrom_id, position):
+        '''
+        Same as :meth:`query`, but the chromosome is given by its id (see :meth:`chromosome_id`).
+        '''
+        if self._query_index is not None:
+            return self._query_index.query(chrom_id, position)
+        tree = self.source_index[chrom_id]
+        if tree is None:
+            return None
+        else:
+            return tree.query(position)
+
     def query(self, chromosome, position):
         '''
         Given a chromosome and position, returns all matching records from the chain index.
@@ -177,18 +411,74 @@ class LiftOverChainFile:
         
         If chromosome is not found in the index, None is returned.
         '''
-        # A somewhat-ugly hack to allow both 'bytes' and 'str' objects to be used as
-        # chromosome names in Python 3. As we store chromosome names as strings,
-        # we'll transparently translate the query to a string too.
-        if type(chromosome).__name__ == 'bytes':
-            chromosome = chromosome.decode('ascii')
-        if chromosome not in self.chain_index:
+        # Both 'bytes' and 'str' names (as well as aliases) are resolved by the chromosome dictionary.
+        chrom_id = self.chromosomes.resolve(chromosome)
+        if chrom_id is None:
             return None
         else:
-            return self.chain_index[chromosome].query(position)
+            return self.query_id(chrom_id, position)
+
+
+class ChainFilter:
+    '''
+    Selection criteria for the chains to be loaded from a chain file:
+     * min_score: only chains with score >= min_score are accepted.
+     * source_chromosomes, target_chromosomes: only chains with the source (resp. target) chromosome from the given collection of names are accepted.
+       Instead of a collection, a regular expression (either a string or a compiled pattern) may be given. A string pattern must match the whole name.
+       Note that a single string is always treated as a regular expression: names with special characters, such as
+       the dots of RefSeq/GenBank accessions (e.g. 'NC_000001.11'), must be given as a collection (['NC_000001.11']) or escaped.
+     * regions: only alignment blocks overlapping the given source regions are kept. Chains left without blocks are dropped.
+       The regions may be given as a :class:`pyliftover.regions.RegionSet`, a name of a BED file or an iterable of (chromosome, start, end) tuples.
+    Parameters set to None impose no restrictions.
+
+    >>> flt = ChainFilter(min_score=1000, source_chromosomes=r'chr[0-9XY]+', regions=[('chr1', 100, 200)])
+    >>> flt.accepts_header(b'chain 4900 chr1 1000 + 0 150 chr5 1000 - 0 150 1'), flt.accepts_header(b'chain 900 chr1 1000 + 0 150 chr5 1000 - 0 150 1')
+    (True, False)
+    >>> flt.accepts_header(b'chain 4900 chr1_random 1000 + 0 150 chr5 1000 - 0 150 1'), flt.accepts_header(b'chain 4900 chr1 1000 + 200 250 chr5 1000 - 0 50 1')
+    (False, False)
+    '''
+
+    def __init__(self, min_score=None, source_chromosomes=None, target_chromosomes=None, regions=None):
+        self.min_score = min_score
+        self.source_chromosomes = self._name_matcher(source_chromosomes)
+        self.target_chromosomes = self._name_matcher(target_chromosomes)
+        if regions is not None and not isinstance(regions, RegionSet):
+            regions = read_bed(regions) if isinstance(regions, string_types) else RegionSet(regions)
+        self.regions = regions
+        self.active = not (min_score is None and source_chromosomes is None and target_chromosomes is None and regions is None)
+
+    @staticmethod
+    def _name_matcher(names):
+        '''
+        Converts a collection of names or a regular expression to a function name --> bool.
+        '''
+        if names is None:
+            return None
+        if isinstance(names, string_types):
+            names = re.compile('(?:%s)\\Z' % names)
+        if hasattr(names, 'match'):
+            return lambda name: names.match(name) is not None
+        names = frozenset(names)
+        return names.__contains__
 
+    def accepts_header(self, header):
+        '''
+        Checks whether a chain with the given header line (a bytes object) should be loaded at all.
+        '''
+        fields = header.split()
+        if self.min_score is not None and int(fields[1]) < self.min_score:
+            return False
+        source_name = fields[2].decode('ascii')
+        if self.source_chromosomes is not None and not self.source_chromosomes(source_name):
+            return False
+        if self.target_chromosomes is not None and not self.target_chromosomes(fields[7].decode('ascii')):
+            return False
+        if self.regions is not None and not self.regions.overlaps(source_name, int(fields[5]), int(fields[6])):
+            return False
+        return True
 
-class LiftOverChain:
+
+class LiftOverChain(object):
     '''
     Represents a single chain from an .over.chain file.
     A chain basically maps a set of intervals from "source" coordinates to corresponding coordinates in "target" coordinates.
@@ -198,10 +488,13 @@ class LiftOverChain:
     __slots__ = ['score', 'source_name', 'source_size', 'source_start', 'source_end',
 	             'target_name', 'target_size', 'target_strand', 'target_start', 'target_end', 'id', 'blocks']
 
-    def __init__(self, header, f):
+    def __init__(self, header, f, regions=None):
         '''
         Reads the chain from a stream given the first line and a file opened at all remaining lines.
         On error throws an exception.
+
+        If a RegionSet is given, only the blocks overlapping its regions are kept and the chain's
+        source/target start and end are trimmed to the kept blocks (the blocks may end up empty).
         '''
         if sys.version_info >= (3, 0):
             header = header.decode('ascii') # In Python 2, work with usual strings.
@@ -232,13 +525,49 @@ class LiftOverChain:
         fields = f.readline().decode('ascii').split()
         while len(fields) == 3:
             size, sgap, tgap = int(fields[0]), int(fields[1]), int(fields[2])
-            self.blocks.append((sfrom, sfrom+size, tfrom))
+            if regions is None or regions.overlaps(self.source_name, sfrom, sfrom+size):
+                self.blocks.append((sfrom, sfrom+size, tfrom))
             sfrom += size + sgap
             tfrom += size + tgap
             fields = f.readline().split()
         if len(fields) != 1:
             raise Exception("Expecting one number on the last line of alignments block. (%s)" % header)
         size = int(fields[0])
-        self.blocks.append((sfrom, sfrom+size, tfrom))
+        if regions is None or regions.overlaps(self.source_name, sfrom, sfrom+size):
+            self.blocks.append((sfrom, sfrom+size, tfrom))
         if (sfrom + size) != self.source_end  or (tfrom + size) != self.target_end:
             raise Exception("Alignment blocks do not match specified block sizes. (%s)" % header)
+        if regions is not None and self.blocks:
+            first, last = self.blocks[0], self.blocks[-1]
+            self.source_start, self.source_end = first[0], last[1]
+            self.target_start, self.target_end = first[2], last[2] + (last[1] - last[0])
+
+    def write(self, f):
+        '''
+        Writes the chain in the .over.chain format to a file object open for writing in binary mode.
+        The chain is followed by an empty line, as in the UCSC files.
+        '''
+        header = ['chain', self.score, self.source_name, self.source_size, '+', self.source_start, self.source_end,
+                  self.target_name, self.target_size, self.target_strand, self.target_start, self.target_end]
+        if self.id is not None:
+            header.append(self.id)
+        lines = [' '.join(str(v) for v in header)]
+        for i in range(len(self.blocks) - 1):
+            (sfrom, sto, tfrom), (next_sfrom, _, next_tfrom) = self.blocks[i], self.blocks[i + 1]
+            size = sto - sfrom
+            lines.append('%d\t%d\t%d' % (size, next_sfrom - sto, next_tfrom - tfrom - size))
+        sfrom, sto, _ = self.blocks[-1]
+        lines.append('%d' % (sto - sfrom))
+        lines.append('\n')
+        f.write('\n'.join(lines).encode('ascii'))
+
+    @staticmethod
+    def skip_blocks(f):
+        '''
+        Skips the alignment data lines of a chain, given a file opened right after the chain's header line.
+        '''
+        fields = f.readline().split()
+        while len(fields) == 3:
+            fields = f.readline().split()
+        if len(fields) != 1:
+            raise Exception("Expecting one number on the last line of alignments block.")
@@ -0,0 +1,157 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Chromosome name dictionary and alias handling.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import sys
+
+if sys.version_info >= (3, 0):
+    from sys import intern
+else:
+    intern = intern
+
+
+def chromosome_aliases(name):
+    '''
+    Returns a list of conventional alternative spellings for a chromosome name,
+    covering the UCSC ("chr1", "chrM") and Ensembl ("1", "MT") naming styles.
+    The name itself is not included in the result.
+
+    >>> chromosome_aliases('chr1')
+    ['1']
+    >>> chromosome_aliases('X')
+    ['chrX']
+    >>> sorted(chromosome_aliases('chrM'))
+    ['M', 'MT', 'chrMT']
+    >>> sorted(chromosome_aliases('MT'))
+    ['M', 'chrM', 'chrMT']
+    '''
+    if name.startswith('chr'):
+        short = name[3:]
+    else:
+        short = name
+    if short in ('M', 'MT'):
+        variants = ['M', 'MT', 'chrM', 'chrMT']
+    else:
+        variants = [short, 'chr' + short]
+    return [v for v in variants if v != name]
+
+
+def read_chrom_alias(f):
+    '''
+    Reads a UCSC ``chromAlias.txt`` file and returns a dict: alias --> chromosome name.
+    This is the way to use e.g. RefSeq or GenBank accessions ("NC_000001.11") with a UCSC chain file.
+    f must be a file object open for reading (in text or binary mode).
+
+    Two layouts are understood:
+     * The legacy three-column one: ``alias <tab> ucscName <tab> source``.
+     * The newer one with a header line ``# ucsc <tab> assembly <tab> genbank <tab> refseq ...``,
+       where the first column is the UCSC name and all the remaining ones are its aliases.
+
+    >>> from io import BytesIO
+    >>> sorted(read_chrom_alias(BytesIO(b'NC_000001.11\\tchr1\\trefseq\\n1\\tchr1\\tensembl\\n')).items())
+    [('1', 'chr1'), ('NC_000001.11', 'chr1')]
+    >>> sorted(read_chrom_alias(BytesIO(b'# ucsc\\tassembly\\trefseq\\nchrM\\tMT\\tNC_012920.1\\n')).items())
+    [('MT', 'chrM'), ('NC_012920.1', 'chrM')]
+    '''
+    aliases = {}
+    header_format = None
+    for line in f:
+        if not isinstance(line, str):
+            line = line.decode('ascii')
+        if line.startswith('#'):
+            header_format = True
+            continue
+        fields = line.rstrip('\r\n').split('\t')
+        if header_format is None:
+            header_format = False
+        if header_format:
+            for alias in fields[1:]:
+                if alias and alias != fields[0]:
+                    aliases[alias] = fields[0]
+        elif len(fields) >= 2:
+            aliases[fields[0]] = fields[1]
+    return aliases
+
+
+class ChromosomeDictionary:
+    '''
+    Assigns compact integer ids to chromosome names and resolves names (or their aliases) to those ids.
+    Ids are assigned consecutively, starting from 0, in the order the names are added.
+    The name strings are interned, so that all chains referring to the same chromosome share a single string object.
+
+    >>> d = ChromosomeDictionary()
+    >>> d.add('chr1'), d.add('chrM'), d.add('chr1')
+    (0, 1, 0)
+    >>> d.resolve('chr1'), d.resolve(b'chrM'), d.resolve('MT')
+    (0, 1, None)
+    >>> d.add_aliases(True)
+    >>> d.resolve('1'), d.resolve('MT'), d.resolve('chrMT')
+    (0, 1, 1)
+    >>> d.add_aliases({'NC_012920.1': 'chrM', 'unknown_alias': 'chrUn'})
+    >>> d.resolve('NC_012920.1'), d.resolve('unknown_alias')
+    (1, None)
+    >>> d.name(1), len(d)
+    ('chrM', 2)
+    '''
+    __slots__ = ['names', 'ids']
+
+    def __init__(self):
+        self.names = []  # id --> name
+        self.ids = {}    # name or alias --> id
+
+    def add(self, name):
+        '''
+        Registers a chromosome name (if it is not yet known) and returns its id.
+        '''
+        chrom_id = self.ids.get(name)
+        if chrom_id is None or self.names[chrom_id] != name:
+            chrom_id = len(self.names)
+            name = intern(name)
+            self.names.append(name)
+            self.ids[name] = chrom_id
+        return chrom_id
+
+    def add_aliases(self, aliases):
+        '''
+        Registers aliases for the already added names.
+        If aliases == True, conventional UCSC/Ensembl name variants (see :func:`chromosome_aliases`) are registered for each name.
+        Otherwise aliases must be a dict: alias --> chromosome name (e.g. as returned by :func:`read_chrom_alias`).
+        Aliases which refer to unknown chromosomes are ignored. An alias never overrides an actual chromosome name.
+        '''
+        if aliases is True:
+            aliases = dict((alias, name) for name in self.names for alias in chromosome_aliases(name))
+        for alias, name in aliases.items():
+            chrom_id = self.ids.get(name)
+            if chrom_id is not None and alias not in self.ids:
+                self.ids[alias] = chrom_id
+
+    def resolve(self, name):
+        '''
+        Returns the id of the given chromosome name (or alias). Both 'str' and 'bytes' names are accepted.
+        If the name is unknown, returns None.
+        '''
+        chrom_id = self.ids.get(name)
+        if chrom_id is None and isinstance(name, bytes) and not isinstance(name, str):
+            chrom_id = self.ids.get(name.decode('ascii'))
+        return chrom_id
+
+    def name(self, chrom_id):
+        '''
+        Returns the chromosome name, corresponding to the given id.
+        '''
+        return self.names[chrom_id]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __iter__(self):
+        return iter(self.names)
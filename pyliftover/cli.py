@@ -0,0 +1,175 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Command-line interface.
+
+Usage::
+
+    $ pyliftover subset hg38ToHg19.over.chain.gz panel.bed panel.over.chain.gz
+    $ pyliftover info hg38ToHg19.over.chain.gz
+    $ pyliftover mask hg38ToHg19.over.chain.gz hg38.mappability.bed
+    $ pyliftover serve hg38ToHg19.over.chain.gz hg19ToHg38.over.chain.gz --port 8765
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import argparse
+import gzip
+import os
+import sys
+
+from .chainfile import LiftOverChainFile
+from .liftover import LiftOver
+from .mask import CLASS_NAMES
+
+
+def _open(filename, mode):
+    '''
+    Opens a (possibly gzip-compressed, judging by the .gz extension) file in binary mode.
+    '''
+    if filename.lower().endswith('.gz'):
+        return gzip.open(filename, mode + 'b')
+    else:
+        return open(filename, mode + 'b')
+
+
+def _load_chain_file(args, **kwargs):
+    f = _open(args.chain_file, 'r')
+    try:
+        return LiftOverChainFile(f, min_score=args.min_score, source_chromosomes=args.source_chromosomes,
+                                 target_chromosomes=args.target_chromosomes, **kwargs)
+    finally:
+        f.close()
+
+
+def subset(args):
+    '''
+    Writes the chains (trimmed to the blocks) overlapping the regions of a BED file to a new chain file.
+    '''
+    chain_file = _load_chain_file(args, regions=args.regions)
+    f = _open(args.output, 'w')
+    try:
+        chain_file.write(f)
+    finally:
+        f.close()
+    sys.stderr.write("Wrote %d chains (%d blocks) to %s\n" % (len(chain_file.chains), sum(len(c.blocks) for c in chain_file.chains), args.output))
+
+
+def info(args):
+    '''
+    Prints the number of chains, blocks, index nodes and bytes used for each source chromosome of a chain file.
+    '''
+    chain_file = _load_chain_file(args, index=args.index)
+    d = chain_file.describe()
+    columns = ['chains', 'blocks', 'tree_nodes', 'mid_entries', 'duplicated_mid_entries', 'bytes']
+    rows = sorted(d['chromosomes'].items(), key=lambda item: item[1]['bytes'], reverse=True)
+    if args.top is not None:
+        rows = rows[:args.top]
+    name_width = max([len('chromosome')] + [len(name) for (name, stats) in rows])
+    fmt = '%-' + str(name_width) + 's' + ' %12s' * len(columns)
+    print(fmt % tuple(['chromosome'] + columns))
+    for (name, stats) in rows + [('TOTAL', d['total'])]:
+        print(fmt % tuple([name] + [stats[c] for c in columns]))
+    print("Total memory: %.1f MB" % (d['total']['bytes'] / 1048576.0))
+
+
+def mask(args):
+    '''
+    Writes the mappability mask (unmapped / unique / multi runs) of the source chromosomes to a BED file.
+    '''
+    lo = LiftOver(args.chain_file, min_score=args.min_score, source_chromosomes=args.source_chromosomes, target_chromosomes=args.target_chromosomes)
+    classes = [CLASS_NAMES.index(c) for c in args.classes.split(',')]
+    f = _open(args.output, 'w')
+    try:
+        lo.write_mappability_bed(f, classes)
+    finally:
+        f.close()
+
+
+def _chain_name(filename):
+    '''
+    >>> _chain_name('/data/hg38ToHg19.over.chain.gz')
+    'hg38ToHg19'
+    '''
+    name = os.path.basename(filename)
+    for ext in ['.gz', '.chain', '.over', '.liftOver']:
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+    return name
+
+
+def serve(args):
+    '''
+    Loads the chain files and runs the conversion service until interrupted.
+    '''
+    from .server import make_server
+    liftovers = {}
+    for spec in args.chain_files:
+        name, _, filename = spec.rpartition('=')
+        liftovers[name or _chain_name(filename)] = LiftOver(filename, min_score=args.min_score, source_chromosomes=args.source_chromosomes,
+                                                            target_chromosomes=args.target_chromosomes)
+    server = make_server(liftovers, host=args.host, port=args.port, unix_socket=args.unix_socket, max_batch=args.max_batch,
+                         max_delay=args.max_delay / 1000.0, max_queue=args.max_queue, quiet=args.quiet)
+    sys.stderr.write("Serving %s on %s\n" % (', '.join(sorted(liftovers)), args.unix_socket or '%s:%d' % server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument('chain_file', help="Chain file (.over.chain or .over.chain.gz)")
+    _add_chain_filter_options(parser)
+
+
+def _add_chain_filter_options(parser):
+    parser.add_argument('--min-score', type=int, default=None, help="Ignore chains with score less than this")
+    parser.add_argument('--source-chromosomes', default=None, metavar='REGEX', help="Only use chains with source chromosome names matching this regular expression")
+    parser.add_argument('--target-chromosomes', default=None, metavar='REGEX', help="Only use chains with target chromosome names matching this regular expression")
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='pyliftover', description="Pure-python implementation of UCSC liftOver genome coordinate conversion.")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('subset', help="Extract the chains overlapping a set of source regions into a smaller chain file")
+    _add_filter_arguments(p)
+    p.add_argument('regions', help="BED file with source regions")
+    p.add_argument('output', help="Output chain file (gzip-compressed if the name ends with .gz)")
+    p.set_defaults(func=subset)
+
+    p = subparsers.add_parser('info', help="Print chain counts and memory usage of a loaded chain file, for each source chromosome")
+    _add_filter_arguments(p)
+    p.add_argument('--top', type=int, default=None, help="Only list this many chromosomes using the most memory")
+    p.add_argument('--index', choices=['tree', 'flat', 'binned'], default='tree', help="Lookup index to build (default: %(default)s)")
+    p.set_defaults(func=info)
+
+    p = subparsers.add_parser('mask', help="Write the mappability mask (unmapped / unique / multi runs) of the source chromosomes to a BED file")
+    _add_filter_arguments(p)
+    p.add_argument('output', help="Output BED file (gzip-compressed if the name ends with .gz)")
+    p.add_argument('--classes', default=','.join(CLASS_NAMES), help="Comma-separated classes of runs to write (default: %(default)s)")
+    p.set_defaults(func=mask)
+
+    p = subparsers.add_parser('serve', help="Serve point and region conversions over a local HTTP API")
+    p.add_argument('chain_files', nargs='+', metavar='[NAME=]CHAIN_FILE', help="Chain files to serve. Requests refer to them by NAME, which defaults to the file name without extensions")
+    p.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: %(default)s)")
+    p.add_argument('--port', type=int, default=8765, help="Port to listen on (default: %(default)s)")
+    p.add_argument('--unix-socket', default=None, help="Listen on this Unix domain socket instead of a TCP port")
+    p.add_argument('--max-batch', type=int, default=4096, help="Maximum number of point queries converted in one batch (default: %(default)s)")
+    p.add_argument('--max-delay', type=float, default=2.0, help="Milliseconds to wait for more requests to join a batch (default: %(default)s)")
+    p.add_argument('--max-queue', type=int, default=1024, help="Maximum number of pending requests, beyond which the server responds with 503 (default: %(default)s)")
+    _add_chain_filter_options(p)
+    p.add_argument('--quiet', action='store_true', help="Do not log requests")
+    p.set_defaults(func=serve)
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    args.func(args)
+    return 0
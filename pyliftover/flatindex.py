@@ -0,0 +1,171 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Flat, read-only index of chain blocks.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class FlatIndex:
+    '''
+    A read-only alternative to the per-chromosome IntervalTree index of a :class:`pyliftover.chainfile.LiftOverChainFile`.
+
+    For each source chromosome all alignment blocks are stored in flat arrays, sorted by block start.
+    Along with the block ends we keep their running maximum, which lets a query stop scanning as soon as
+    no earlier block can reach the query point. A lookup is thus a single binary search (done by the C-implemented bisect)
+    followed by a short scan over the (typically one or two) blocks which end after the query point.
+
+    The index is never modified after construction, hence a single instance may be shared by any number of threads
+    without any locking (including free-threaded CPython builds).
+
+    Chromosomes are referred to by their ids from the chain file's :class:`pyliftover.chromosomes.ChromosomeDictionary`.
+    The results have the same form as those of :meth:`pyliftover.intervaltree.IntervalTree.query`, ordered by block start
+    (and by decreasing chain score for blocks with equal starts).
+
+    Blocks are additionally ordered by their ends, which allows finding the nearest blocks around a point (see :meth:`nearest`).
+    '''
+    __slots__ = ['starts', 'ends', 'max_ends', 'target_starts', 'chains', 'sorted_ends', 'end_order']
+
+    def __init__(self, chain_file):
+        '''
+        Builds the index for all chains of a LiftOverChainFile.
+        '''
+        n = len(chain_file.chromosomes)
+        blocks = [None] * n
+        for c in chain_file.chains:
+            chrom_id = chain_file.chromosomes.resolve(c.source_name)
+            if blocks[chrom_id] is None:
+                blocks[chrom_id] = []
+            for (sfrom, sto, tfrom) in c.blocks:
+                if sto > sfrom:
+                    blocks[chrom_id].append((sfrom, sto, tfrom, c))
+        # Per-chromosome data, indexed by chromosome id (None for chromosomes which are not sources of any chain)
+        self.starts = [None] * n
+        self.ends = [None] * n
+        self.max_ends = [None] * n
+        self.target_starts = [None] * n
+        self.chains = [None] * n
+        self.sorted_ends = [None] * n
+        self.end_order = [None] * n
+        for chrom_id in range(n):
+            if blocks[chrom_id] is None:
+                continue
+            chrom_blocks = blocks[chrom_id]
+            chrom_blocks.sort(key=lambda b: (b[0], -b[3].score))
+            self.starts[chrom_id] = array('l', [b[0] for b in chrom_blocks])
+            self.ends[chrom_id] = array('l', [b[1] for b in chrom_blocks])
+            self.target_starts[chrom_id] = array('l', [b[2] for b in chrom_blocks])
+            self.chains[chrom_id] = tuple(b[3] for b in chrom_blocks)
+            max_ends = array('l', self.ends[chrom_id])
+            for i in range(1, len(max_ends)):
+                if max_ends[i] < max_ends[i - 1]:
+                    max_ends[i] = max_ends[i - 1]
+            self.max_ends[chrom_id] = max_ends
+            end_order = sorted(range(len(chrom_blocks)), key=lambda i: (chrom_blocks[i][1], chrom_blocks[i][3].score))
+            self.end_order[chrom_id] = array('l', end_order)
+            self.sorted_ends[chrom_id] = array('l', [chrom_blocks[i][1] for i in end_order])
+
+    def query(self, chrom_id, x):
+        '''
+        Returns all blocks of the given source chromosome, which overlap the point x, as a list
+        of (source_from, source_to, (target_from, chain)) records.
+        If the chromosome is not a source chromosome of any chain, returns None.
+        '''
+        starts = self.starts[chrom_id]
+        if starts is None:
+            return None
+        ends, max_ends = self.ends[chrom_id], self.max_ends[chrom_id]
+        result = []
+        i = bisect_right(starts, x) - 1
+        while i >= 0 and max_ends[i] > x:
+            if ends[i] > x:
+                result.append((starts[i], ends[i], (self.target_starts[chrom_id][i], self.chains[chrom_id][i])))
+            i -= 1
+        result.reverse()
+        return result
+
+    def nearest(self, chrom_id, x):
+        '''
+        Finds the blocks of the given source chromosome nearest to the point x from each side:
+        the upstream one (with the largest end <= x) and the downstream one (with the smallest start > x).
+        Among several such blocks, the one from the chain with the highest score is chosen.
+        Returns a pair of (source_from, source_to, (target_from, chain)) records, either of which may be None if there is no block on that side.
+        If the chromosome is not a source chromosome of any chain, returns None.
+        Both lookups are binary searches.
+        '''
+        starts = self.starts[chrom_id]
+        if starts is None:
+            return None
+        upstream = downstream = None
+        i = bisect_right(self.sorted_ends[chrom_id], x) - 1
+        if i >= 0:
+            upstream = self._block(chrom_id, self.end_order[chrom_id][i])
+        i = bisect_right(starts, x)
+        if i < len(starts):
+            downstream = self._block(chrom_id, i)
+        return (upstream, downstream)
+
+    def _block(self, chrom_id, i):
+        return (self.starts[chrom_id][i], self.ends[chrom_id][i], (self.target_starts[chrom_id][i], self.chains[chrom_id][i]))
+
+    def __len__(self):
+        '''
+        The number of blocks in the index.
+        '''
+        return sum(len(s) for s in self.starts if s is not None)
+
+
+class BinnedIndex(FlatIndex):
+    '''
+    A FlatIndex with an additional direct lookup table over fixed-size genomic bins (of 2**bin_bits bases).
+    For each bin, the range of candidate blocks (in the start-sorted order), which may overlap the bin, is precomputed.
+    A lookup computes the bin number with a single shift and then binary-searches only among the few candidate blocks
+    of the bin rather than among all blocks of the chromosome. (A linear scan of the candidates would avoid the binary search,
+    but in pure Python it is slower than the C-implemented bisect over the same short range.)
+    Apart from that, the index behaves exactly as FlatIndex (and gives the results in the same order).
+    '''
+    __slots__ = ['bin_bits', 'bin_first', 'bin_last']
+
+    def __init__(self, chain_file, bin_bits=12):
+        FlatIndex.__init__(self, chain_file)
+        self.bin_bits = bin_bits
+        n = len(self.starts)
+        self.bin_first = [None] * n  # Per chromosome: bin --> index of the first candidate block
+        self.bin_last = [None] * n   # Per chromosome: bin --> index after the last candidate block
+        for chrom_id in range(n):
+            starts, max_ends = self.starts[chrom_id], self.max_ends[chrom_id]
+            if starts is None:
+                continue
+            n_bins = ((max_ends[-1] - 1) >> bin_bits) + 1 if len(starts) else 0
+            # Blocks before the first candidate can not reach the bin (as max_ends is non-decreasing),
+            # blocks after the last one start after the bin.
+            self.bin_first[chrom_id] = array('l', [bisect_right(max_ends, b << bin_bits) for b in range(n_bins)])
+            self.bin_last[chrom_id] = array('l', [bisect_left(starts, (b + 1) << bin_bits) for b in range(n_bins)])
+
+    def query(self, chrom_id, x):
+        '''
+        Same as :meth:`FlatIndex.query`.
+        '''
+        starts = self.starts[chrom_id]
+        if starts is None:
+            return None
+        b = x >> self.bin_bits
+        first = self.bin_first[chrom_id]
+        if b < 0 or b >= len(first):
+            return []
+        lo = first[b]
+        ends, max_ends = self.ends[chrom_id], self.max_ends[chrom_id]
+        result = []
+        i = bisect_right(starts, x, lo, self.bin_last[chrom_id][b]) - 1
+        while i >= lo and max_ends[i] > x:
+            if ends[i] > x:
+                result.append((starts[i], ends[i], (self.target_starts[chrom_id][i], self.chains[chrom_id][i])))
+            i -= 1
+        result.reverse()
+        return result
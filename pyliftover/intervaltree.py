@@ -10,6 +10,8 @@ http://kt.era.ee/
 Licensed under MIT license.
 '''
 
+from .memory import deep_sizeof
+
 
 class IntervalTree:
     '''
@@ -136,6 +138,75 @@ class IntervalTree:
             if self.right_subtree is not None:
                 self.right_subtree._query(x, result)
 
+    def describe(self):
+        '''
+        Returns a dict with the structural statistics of the tree:
+         * nodes: number of tree nodes,
+         * intervals: number of stored intervals,
+         * mid_entries: number of intervals stored in the "mid" lists of the nodes,
+         * duplicated_mid_entries: number of extra references to those intervals (each is kept both in mid_sorted_by_start and mid_sorted_by_end),
+         * depth: maximum depth of the tree,
+         * bytes: memory used by the tree (see :meth:`memory_usage`).
+
+        >>> t = IntervalTree(0, 100)
+        >>> t.add_interval(10, 25)
+        >>> t.add_interval(45, 55)
+        >>> t.add_interval(60, 70)
+        >>> t.sort()
+        >>> d = t.describe()
+        >>> (d['nodes'], d['intervals'], d['mid_entries'], d['duplicated_mid_entries'], d['depth'])
+        (3, 3, 1, 1, 2)
+        '''
+        nodes, mid_entries, duplicated, depth = 0, 0, 0, 0
+        stack = [(self, 1)]
+        while stack:
+            node, level = stack.pop()
+            nodes += 1
+            depth = max(depth, level)
+            mid_entries += len(node.mid_sorted_by_start)
+            duplicated += len(node.mid_sorted_by_end)
+            for subtree in (node.left_subtree, node.right_subtree):
+                if subtree is not None:
+                    stack.append((subtree, level + 1))
+        return {'nodes': nodes, 'intervals': len(self), 'mid_entries': mid_entries, 'duplicated_mid_entries': duplicated,
+                'depth': depth, 'bytes': self.memory_usage()}
+
+    def memory_usage(self, seen=None):
+        '''
+        Returns the number of bytes used by the tree, including the stored intervals and their data.
+        Objects with ids in the set ``seen`` are not counted (see :func:`pyliftover.memory.deep_sizeof`).
+
+        >>> t = IntervalTree(0, 100)
+        >>> empty_size = t.memory_usage()
+        >>> t.add_interval(10, 25)
+        >>> t.memory_usage() > empty_size
+        True
+        '''
+        return deep_sizeof(self, seen)
+
+    def __getstate__(self):
+        '''
+        Pickling support. The tree is stored as a flat list of its intervals, rather than as a
+        recursive structure of nodes, and is rebuilt on unpickling.
+
+        >>> import pickle
+        >>> t = IntervalTree(0, 100)
+        >>> t.add_interval(10, 25, 'a')
+        >>> t.add_interval(15, 27)
+        >>> t.sort()
+        >>> t2 = pickle.loads(pickle.dumps(t))
+        >>> t2.query(24), len(t2)
+        ([(10, 25, 'a'), (15, 27, None)], 2)
+        '''
+        return (self.min, self.max, list(self))
+
+    def __setstate__(self, state):
+        min, max, intervals = state
+        self.__init__(min, max)
+        for (start, end, data) in intervals:
+            self.add_interval(start, end, data)
+        self.sort()
+
     def __len__(self):
         '''
         The number of intervals maintained in the tree.
@@ -10,10 +10,20 @@ Licensed under MIT license.
 
 import os.path
 import gzip
+import sys
 from .chainfile import open_liftover_chain_file, LiftOverChainFile
 
+def _gil_enabled():
+    '''
+    False only on free-threaded CPython builds running with the GIL disabled.
+    '''
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
 class LiftOver:
-    def __init__(self, from_db, to_db=None, search_dir='.', cache_dir=os.path.expanduser("~/.pyliftover"), use_web=True, write_cache=True, use_gzip=None, show_progress=False):
+    def __init__(self, from_db, to_db=None, search_dir='.', cache_dir=os.path.expanduser("~/.pyliftover"), use_web=True, write_cache=True, use_gzip=None, show_progress=False, aliases=None,
+                 min_score=None, source_chromosomes=None, target_chromosomes=None, regions=None, index='tree'):
         '''
         LiftOver can be initialized in multiple ways.
          * By providing a filename as a single argument: LiftOver("hg17ToHg18.over.chain.gz")
@@ -26,6 +36,13 @@ class LiftOver:
            The exact way this is handled (as well as all the other parameters of the constructor) is documented in 
            :see:`pyliftover.chainfile.open_liftover_chain_file`.
         If show_progress == True, a progress bar will be shown in the console. This requires tqdm to be installed (not installed automatically with the package).
+        If aliases is provided, source chromosomes may also be referred to by alternative names, e.g. "1" instead of "chr1"
+        (see :class:`pyliftover.chainfile.LiftOverChainFile` for details).
+        The min_score, source_chromosomes, target_chromosomes and regions parameters restrict the set of chains
+        which are loaded and indexed (see :class:`pyliftover.chainfile.ChainFilter`). E.g. LiftOver('hg38', 'hg19', source_chromosomes=r'chr[0-9XYM]+')
+        would ignore all the alt/random/fix contigs. Note that a single string is a regular expression, so plain names containing dots
+        (e.g. RefSeq accessions) must be given as a list: source_chromosomes=['NC_000001.11'].
+        The index parameter selects the lookup index: 'tree' (default), 'flat' or 'binned' (see :class:`pyliftover.chainfile.LiftOverChainFile`).
         
         Test providing filename:
         >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
@@ -60,9 +77,34 @@ class LiftOver:
         else:
             # From- and To- db names were provided.
             f = open_liftover_chain_file(from_db=from_db, to_db=to_db, search_dir=search_dir, cache_dir=cache_dir, use_web=use_web, write_cache=write_cache)
-        self.chain_file = LiftOverChainFile(f, show_progress=show_progress)
+        self.chain_file = LiftOverChainFile(f, show_progress=show_progress, aliases=aliases, min_score=min_score,
+                                            source_chromosomes=source_chromosomes, target_chromosomes=target_chromosomes, regions=regions,
+                                            index=index)
         f.close()
         
+    def memory_usage(self):
+        '''
+        Returns the number of bytes used by the loaded chain file and its indexes.
+        '''
+        return self.chain_file.memory_usage()
+
+    def describe(self):
+        '''
+        Returns per-chromosome and total statistics of the loaded chain file: number of chains, blocks, index tree nodes, and bytes used.
+        See :meth:`pyliftover.chainfile.LiftOverChainFile.describe`.
+        '''
+        return self.chain_file.describe()
+
+    def __getstate__(self):
+        '''
+        Pickling support (e.g. for sending a LiftOver object to Spark/Dask/multiprocessing workers).
+        Only the chain file is stored, and it is stored compactly (see :meth:`pyliftover.chainfile.LiftOverChainFile.__getstate__`).
+        '''
+        return {'chain_file': self.chain_file}
+
+    def __setstate__(self, state):
+        self.chain_file = state['chain_file']
+
     def convert_coordinate(self, chromosome, position, strand='+'):
         '''
         Returns a *list* of possible conversions for a given chromosome position.
@@ -77,7 +119,198 @@ class LiftOver:
         I.e. position 0 strand + is the first position of the genome. Position 0 strand - is also the first position of the genome 
         (and the last position of reverse-complemented genome).
         '''
-        query_results = self.chain_file.query(chromosome, position)
+        return self._convert(self.chain_file.query(chromosome, position), position, strand)
+
+    def chromosome_id(self, chromosome):
+        '''
+        Returns the integer id of a source chromosome name (or alias), or None if the chromosome is unknown.
+        Resolve the names once and use :meth:`convert_coordinate_id` to avoid any name handling when converting many positions.
+        
+        >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
+        >>> chrom_id = lo.chromosome_id('AP012306.1')
+        >>> lo.convert_coordinate_id(chrom_id, 16000) == lo.convert_coordinate('AP012306.1', 16000)
+        True
+        >>> lo.chromosome_id('Chromosome') is None # Target-only chromosome
+        True
+        '''
+        return self.chain_file.chromosome_id(chromosome)
+
+    def convert_coordinate_id(self, chrom_id, position, strand='+'):
+        '''
+        Same as :meth:`convert_coordinate`, but the source chromosome is given by its id, as returned by :meth:`chromosome_id`.
+        '''
+        return self._convert(self.chain_file.query_id(chrom_id, position), position, strand)
+
+    def convert_region(self, chromosome, start, end, strand='+'):
+        '''
+        Converts a region [start, end) (0-based, end-exclusive) by converting its first and last positions.
+        Returns a list of (target_chromosome, target_start, target_end, target_strand, conversion_chain_score) tuples, one for each chain
+        which maps both ends of the region, sorted by decreasing score. Note that unlike UCSC's liftOver, no check is made
+        that the bases between the ends are mapped as well.
+        If the chromosome is unknown, None is returned.
+        
+        >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
+        >>> lo.convert_region('AP012306.1', 16000, 16010) #doctest: +ELLIPSIS
+        [('Chromosome', 21175, 21185, '+', 378954552...)]
+        >>> lo.convert_region('AP012306.1', 16000, 16000)
+        []
+        '''
+        first = self.chain_file.query(chromosome, start)
+        if first is None:
+            return None
+        if end <= start:
+            return []
+        last = self.chain_file.query(chromosome, end - 1)
+        results = []
+        for (s_start, s_end, (t_start, chain)) in first:
+            for (e_start, e_end, (e_t_start, e_chain)) in last:
+                if e_chain is chain:
+                    a = t_start + (start - s_start)
+                    b = e_t_start + (end - 1 - e_start)
+                    if chain.target_strand == '-':
+                        a, b = chain.target_size - 1 - b, chain.target_size - 1 - a
+                    result_strand = chain.target_strand if strand == '+' else ('+' if chain.target_strand == '-' else '-')
+                    results.append((chain.target_name, a, b + 1, result_strand, chain.score))
+        results.sort(key=lambda x: x[4], reverse=True)
+        return results
+
+    def mappability(self, chromosome, position):
+        '''
+        Classifies a source position without converting it. Returns one of the constants of :mod:`pyliftover.mask`:
+        UNMAPPED (0), UNIQUE (1) or MULTI (2), i.e. the number of results :meth:`convert_coordinate` would return, capped at 2.
+        IF chromosome is completely unknown to the LiftOver, None is returned.
+        The (precomputed) mappability mask is built on first use, see :meth:`pyliftover.chainfile.LiftOverChainFile.mappability_mask`.
+        
+        >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
+        >>> lo.mappability('AP012306.1', 215030), lo.mappability('AP012306.1', 215031), lo.mappability('AP012306.1', -1)
+        (0, 1, 0)
+        >>> lo.mappability_runs('AP012306.1', 215020, 215040)
+        [(215020, 215030, 1), (215030, 215031, 0), (215031, 215040, 1)]
+        '''
+        chrom_id = self.chain_file.chromosomes.resolve(chromosome)
+        if chrom_id is None:
+            return None
+        return self.chain_file.mappability_mask().classify(chrom_id, position)
+
+    def mappability_runs(self, chromosome, start=0, end=None):
+        '''
+        Returns the list of (run_start, run_end, class) runs of equally-classified (see :meth:`mappability`) bases
+        covering the source region [start, end) (by default, the whole chromosome). The runs are clipped to the region.
+        IF chromosome is completely unknown to the LiftOver, None is returned.
+        '''
+        chrom_id = self.chain_file.chromosomes.resolve(chromosome)
+        if chrom_id is None:
+            return None
+        return self.chain_file.mappability_mask().runs(chrom_id, start, end)
+
+    def write_mappability_bed(self, f, classes=(0, 1, 2)):
+        '''
+        Writes the mappability runs of all source chromosomes in BED format (chromosome, start, end, class name)
+        to a file object open for writing in binary mode. Only the runs of the given classes are written.
+        '''
+        self.chain_file.mappability_mask().write_bed(f, self.chain_file.chromosomes, classes)
+
+    def convert_many(self, queries, threads=None, chunk_size=10000):
+        '''
+        Converts a batch of positions. queries must be an iterable of (chromosome, position) or (chromosome, position, strand) tuples.
+        Returns a list with a result for each query, as would be returned by :meth:`convert_coordinate`
+        (except that the order of equally-scored multiple conversions may differ).
+
+        The lookups are done using the chain file's read-only block index (see :meth:`pyliftover.chainfile.LiftOverChainFile.block_index`).
+        If threads > 1, the queries are split into chunks of chunk_size, which are converted in parallel by a pool of threads.
+        This only helps on free-threaded CPython builds: the lookups are pure Python and hold the GIL, so when the GIL
+        is enabled a pool could only add overhead, and the queries are converted in the calling thread instead.
+        
+        >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
+        >>> lo.convert_many([('AP012306.1', 16000), ('AP012306.1', 16000, '-'), ('chrZ', 1)]) #doctest: +ELLIPSIS
+        [[('Chromosome', 21175, '+', 378954552...)], [('Chromosome', 21175, '-', 378954552...)], None]
+        '''
+        index = self.chain_file.block_index()
+        if not isinstance(queries, list):
+            queries = list(queries)
+        if threads is None or threads <= 1 or len(queries) <= chunk_size or _gil_enabled():
+            return self._convert_many(index, queries)
+        from concurrent.futures import ThreadPoolExecutor
+        chunks = [queries[i:i + chunk_size] for i in range(0, len(queries), chunk_size)]
+        results = []
+        with ThreadPoolExecutor(threads) as executor:
+            for chunk_results in executor.map(lambda chunk: self._convert_many(index, chunk), chunks):
+                results.extend(chunk_results)
+        return results
+
+    def _convert_many(self, index, queries):
+        ids, resolve = self.chain_file.chromosomes.ids, self.chain_file.chromosomes.resolve
+        query, convert = index.query, self._convert
+        results = []
+        for q in queries:
+            chrom_id = ids.get(q[0])
+            if chrom_id is None:
+                chrom_id = resolve(q[0])  # E.g. a 'bytes' name
+            results.append(convert(None if chrom_id is None else query(chrom_id, q[1]), q[1], q[2] if len(q) > 2 else '+'))
+        return results
+
+    def nearest_mapped(self, chromosome, position, strand='+'):
+        '''
+        Finds the nearest mapped positions on each side of a source position, which is useful for positions which
+        fall in gaps between alignment blocks (i.e. for which :meth:`convert_coordinate` returns an empty list).
+        
+        Returns a pair (upstream, downstream), where upstream describes the last base of the nearest block which ends at or before position,
+        and downstream describes the first base of the nearest block which starts after it ("upstream" and "downstream" refer to the + strand of the source).
+        Each is either None (no block on that side of the chromosome) or a tuple
+        (source_position, target_chromosome, target_position, target_strand, conversion_chain_score, distance),
+        where distance = abs(position - source_position). Blocks containing the position itself are not reported.
+        IF chromosome is completely unknown to the LiftOver, None is returned.
+        
+        >>> lo = LiftOver('tests/data/mds42.to.mg1655.liftOver')
+        >>> lo.convert_coordinate('AP012306.1', 215030)
+        []
+        >>> lo.nearest_mapped('AP012306.1', 215030) #doctest: +ELLIPSIS
+        ((215029, 'Chromosome', 226168, '+', 378954552..., 1), (215031, 'Chromosome', 226169, '+', 378954552..., 1))
+        >>> lo.nearest_mapped('AP012306.1', 0)[0] is None
+        True
+        '''
+        chrom_id = self.chain_file.chromosomes.resolve(chromosome)
+        if chrom_id is None:
+            return None
+        return self._nearest(self.chain_file.block_index(), chrom_id, position, strand)
+
+    def nearest_mapped_many(self, queries):
+        '''
+        Batch version of :meth:`nearest_mapped`. queries must be an iterable of (chromosome, position) or (chromosome, position, strand) tuples.
+        Returns a list with a result for each query.
+        '''
+        index = self.chain_file.block_index()
+        resolve = self.chain_file.chromosomes.resolve
+        results = []
+        for q in queries:
+            chrom_id = resolve(q[0])
+            results.append(None if chrom_id is None else self._nearest(index, chrom_id, q[1], q[2] if len(q) > 2 else '+'))
+        return results
+
+    @staticmethod
+    def _nearest(index, chrom_id, position, strand):
+        blocks = index.nearest(chrom_id, position)
+        if blocks is None:
+            return None
+        results = []
+        for (block, side) in zip(blocks, (-1, 0)):
+            if block is None:
+                results.append(None)
+                continue
+            source_start, source_end, (target_start, chain) = block
+            source_position = source_end - 1 if side else source_start
+            target_position = target_start + (source_position - source_start)
+            if chain.target_strand == '-':
+                target_position = chain.target_size - 1 - target_position
+            result_strand = chain.target_strand if strand == '+' else ('+' if chain.target_strand == '-' else '-')
+            results.append((source_position, chain.target_name, target_position, result_strand, chain.score, abs(position - source_position)))
+        return tuple(results)
+
+    @staticmethod
+    def _convert(query_results, position, strand):
+        '''
+        Remaps the results of a chain file query for a given position to the list of target positions.
+        '''
         if query_results is None:
             return None
         else:
@@ -0,0 +1,140 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Mappability mask: run-length encoded classification of source bases into unmapped, uniquely mapped and multi-mapped ones.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+from array import array
+from bisect import bisect_right
+
+# Classes of source bases: the number of conversions of a base, capped at 2.
+UNMAPPED = 0
+UNIQUE = 1
+MULTI = 2
+CLASS_NAMES = ('unmapped', 'unique', 'multi')
+
+
+class MappabilityMask:
+    '''
+    For each source chromosome of a chain file, stores the maximal runs of bases with the same number of
+    alignment blocks covering them, where this number is capped at 2. That is, every base is classified as
+    UNMAPPED (not covered by any block), UNIQUE (covered by exactly one block) or MULTI (covered by several blocks),
+    which corresponds to :meth:`pyliftover.liftover.LiftOver.convert_coordinate` returning zero, one or several results.
+    Positions outside of the chromosome are UNMAPPED.
+
+    Chromosomes are referred to by their ids from the chain file's :class:`pyliftover.chromosomes.ChromosomeDictionary`.
+    Like the block indexes, the mask is never modified after construction.
+    '''
+    __slots__ = ['run_starts', 'run_classes', 'sizes']
+
+    def __init__(self, chain_file):
+        n = len(chain_file.chromosomes)
+        events = [None] * n
+        self.sizes = [None] * n
+        for c in chain_file.chains:
+            chrom_id = chain_file.chromosomes.resolve(c.source_name)
+            if events[chrom_id] is None:
+                events[chrom_id] = []
+                self.sizes[chrom_id] = c.source_size
+            chrom_events = events[chrom_id]
+            for (sfrom, sto, tfrom) in c.blocks:
+                if sto > sfrom:
+                    chrom_events.append((sfrom, 1))
+                    chrom_events.append((sto, -1))
+        self.run_starts = [None] * n  # Per chromosome: sorted array of run starts (the first one is 0)
+        self.run_classes = [None] * n  # Per chromosome: corresponding array of run classes
+        for chrom_id in range(n):
+            if events[chrom_id] is None:
+                continue
+            chrom_events = events[chrom_id]
+            chrom_events.sort()
+            starts, classes = array('l', [0]), array('b', [UNMAPPED])
+            coverage = 0
+            for i in range(len(chrom_events)):
+                position, delta = chrom_events[i]
+                coverage += delta
+                if i + 1 < len(chrom_events) and chrom_events[i + 1][0] == position:
+                    continue  # Apply all the events at the same position first
+                cls = min(coverage, MULTI)
+                if cls != classes[-1]:
+                    if starts[-1] == position:
+                        classes[-1] = cls  # Zero-length run, replace it
+                        if len(classes) > 1 and classes[-2] == cls:
+                            starts.pop()
+                            classes.pop()
+                    else:
+                        starts.append(position)
+                        classes.append(cls)
+            self.run_starts[chrom_id] = starts
+            self.run_classes[chrom_id] = classes
+
+    def __getstate__(self):
+        '''
+        Pickling support (needed for all pickle protocols, as the class defines __slots__): the run arrays are stored as they are.
+        '''
+        return (self.run_starts, self.run_classes, self.sizes)
+
+    def __setstate__(self, state):
+        self.run_starts, self.run_classes, self.sizes = state
+
+    def classify(self, chrom_id, x):
+        '''
+        Returns the class (UNMAPPED, UNIQUE or MULTI) of the base at position x of the given source chromosome.
+        If the chromosome is not a source chromosome of any chain, returns None.
+        '''
+        starts = self.run_starts[chrom_id]
+        if starts is None:
+            return None
+        if x < 0 or x >= self.sizes[chrom_id]:
+            return UNMAPPED
+        return self.run_classes[chrom_id][bisect_right(starts, x) - 1]
+
+    def runs(self, chrom_id, start=0, end=None):
+        '''
+        Returns the list of (run_start, run_end, class) runs covering the region [start, end) of the given source chromosome.
+        The runs are clipped to the region (which is by default the whole chromosome).
+        If the chromosome is not a source chromosome of any chain, returns None.
+        '''
+        starts = self.run_starts[chrom_id]
+        if starts is None:
+            return None
+        size = self.sizes[chrom_id]
+        if end is None:
+            end = size
+        classes = self.run_classes[chrom_id]
+        runs = []
+        if start < 0:
+            runs.append((start, min(0, end), UNMAPPED))
+        i = max(bisect_right(starts, start) - 1, 0)
+        while i < len(starts) and starts[i] < end:
+            run_end = starts[i + 1] if i + 1 < len(starts) else size
+            runs.append((max(starts[i], start), min(run_end, end), classes[i]))
+            i += 1
+        if end > size:
+            runs.append((max(size, start), end, UNMAPPED))
+        # Drop empty runs and merge the unmapped ones outside of the chromosome with their neighbours
+        result = []
+        for run in runs:
+            if run[0] >= run[1]:
+                continue
+            if result and result[-1][2] == run[2]:
+                result[-1] = (result[-1][0], run[1], run[2])
+            else:
+                result.append(run)
+        return result
+
+    def write_bed(self, f, chromosomes, classes=(UNMAPPED, UNIQUE, MULTI)):
+        '''
+        Writes the runs of the given classes in BED format (chromosome, start, end, class name) to a file object open for writing in binary mode.
+        chromosomes must be the ChromosomeDictionary of the chain file.
+        '''
+        for chrom_id in range(len(self.run_starts)):
+            if self.run_starts[chrom_id] is None:
+                continue
+            name = chromosomes.name(chrom_id)
+            lines = ['%s\t%d\t%d\t%s\n' % (name, s, e, CLASS_NAMES[c]) for (s, e, c) in self.runs(chrom_id) if c in classes]
+            f.write(''.join(lines).encode('ascii'))
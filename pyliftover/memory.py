@@ -0,0 +1,56 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Helpers for measuring the memory footprint of the loaded indexes.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import sys
+import types
+
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen=None):
+    '''
+    Returns the size in bytes of an object along with everything it refers to
+    (container elements, dict keys and values, instance __dict__ and __slots__ attributes).
+    Classes, modules and functions are not counted.
+
+    Objects whose ids are in the set ``seen`` are skipped, and ids of all the counted objects are added to it.
+    Passing the same set to several calls thus makes sure shared objects are counted only once.
+
+    >>> s = 'x' * 1000
+    >>> deep_sizeof([s, s]) == sys.getsizeof([s, s]) + sys.getsizeof(s)
+    True
+    >>> seen = set()
+    >>> deep_sizeof(s, seen) > 1000, deep_sizeof([s], seen) == sys.getsizeof([s])
+    (True, True)
+    '''
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIPPED_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            for cls in type(o).__mro__:
+                slots = getattr(cls, '__slots__', ())
+                for slot in ((slots,) if isinstance(slots, str) else slots):
+                    if hasattr(o, slot):
+                        stack.append(getattr(o, slot))
+            if hasattr(o, '__dict__'):
+                stack.append(o.__dict__)
+    return size
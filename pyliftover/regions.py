@@ -0,0 +1,104 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+A set of genomic regions (e.g. read from a BED file) with fast overlap checks.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import gzip
+import sys
+from bisect import bisect_right
+
+if sys.version_info >= (3, 0):
+    string_types = (str,)
+else:
+    string_types = (basestring,)
+
+
+class RegionSet:
+    '''
+    A set of genomic intervals [start, end), indexed by chromosome.
+    Overlapping and adjacent intervals are merged.
+
+    >>> r = RegionSet([('chr1', 10, 20), ('chr1', 15, 30), ('chr1', 50, 60), ('chr2', 0, 5)])
+    >>> r.regions('chr1')
+    [(10, 30), (50, 60)]
+    >>> r.overlaps('chr1', 0, 10), r.overlaps('chr1', 0, 11), r.overlaps('chr1', 29, 50), r.overlaps('chr1', 30, 50)
+    (False, True, True, False)
+    >>> r.overlaps('chr3', 0, 100)
+    False
+    >>> sorted(r.chromosomes())
+    ['chr1', 'chr2']
+    '''
+    __slots__ = ['starts', 'ends']
+
+    def __init__(self, regions=()):
+        '''
+        Creates a region set from an iterable of (chromosome, start, end) tuples.
+        '''
+        by_chromosome = {}
+        for (chromosome, start, end) in regions:
+            if end > start:
+                by_chromosome.setdefault(chromosome, []).append((int(start), int(end)))
+        self.starts = {}  # chromosome --> sorted list of region starts
+        self.ends = {}    # chromosome --> corresponding list of region ends (sorted as well, as regions are merged)
+        for chromosome, intervals in by_chromosome.items():
+            intervals.sort()
+            starts, ends = [], []
+            for (start, end) in intervals:
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts[chromosome] = starts
+            self.ends[chromosome] = ends
+
+    def overlaps(self, chromosome, start, end):
+        '''
+        Returns True if the interval [start, end) on the given chromosome overlaps any region in the set.
+        '''
+        ends = self.ends.get(chromosome)
+        if ends is None:
+            return False
+        i = bisect_right(ends, start)
+        return i < len(ends) and self.starts[chromosome][i] < end
+
+    def regions(self, chromosome):
+        '''
+        Returns the sorted list of merged (start, end) regions for the given chromosome.
+        '''
+        return list(zip(self.starts.get(chromosome, []), self.ends.get(chromosome, [])))
+
+    def chromosomes(self):
+        return self.starts.keys()
+
+    def __len__(self):
+        return sum(len(s) for s in self.starts.values())
+
+
+def read_bed(f):
+    '''
+    Reads a BED file into a RegionSet. Only the first three columns are used.
+    f may be a file name (gzip-compressed if it ends with .gz) or a file object, open in text or binary mode.
+    Empty lines, comments as well as "track" and "browser" lines are skipped.
+
+    >>> from io import BytesIO
+    >>> read_bed(BytesIO(b'track name=x\\nchr1\\t10\\t20\\tname\\n\\nchr1 15 25\\n')).regions('chr1')
+    [(10, 25)]
+    '''
+    if isinstance(f, string_types):
+        with (gzip.open(f, 'rb') if f.lower().endswith('.gz') else open(f, 'rb')) as fin:
+            return read_bed(fin)
+    regions = []
+    for line in f:
+        if not isinstance(line, str):
+            line = line.decode('ascii')
+        fields = line.split()
+        if not fields or fields[0].startswith('#') or fields[0] in ('track', 'browser'):
+            continue
+        regions.append((fields[0], int(fields[1]), int(fields[2])))
+    return RegionSet(regions)
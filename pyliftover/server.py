@@ -0,0 +1,411 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Local HTTP conversion service and its client.
+
+The service loads chain files once and serves point and region conversions over HTTP/1.1 (with keep-alive),
+either on a TCP port or on a Unix domain socket. Concurrently arriving requests are coalesced into
+micro-batches, which are converted together by a single worker thread per chain file.
+The number of requests waiting for the worker is bounded: when the queue is full, the server
+responds with "503 Service Unavailable" rather than accumulating an ever-growing backlog.
+
+API (all responses are JSON):
+ * ``GET /convert?chrom=chr1&pos=1000000[&strand=-][&chain=hg17ToHg18]``: ``{"result": [[chrom, pos, strand, score], ...]}``.
+ * ``POST /convert`` with ``{"queries": [[chrom, pos(, strand)], ...](, "chain": ...)}``: ``{"results": [...]}``.
+ * ``POST /convert_region`` with ``{"regions": [[chrom, start, end(, strand)], ...](, "chain": ...)}``: ``{"results": [...]}``.
+ * ``GET /health``: ``{"status": "ok", "chains": [...]}``.
+Results for unknown chromosomes are null.
+
+Start the service with ``pyliftover serve hg17ToHg18.over.chain.gz --port 8765``
+and query it using :class:`LiftOverClient`.
+
+Requires Python 3.7+.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import errno
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+
+class Overloaded(Exception):
+    '''
+    Raised by :meth:`BatchConverter.submit` when the queue of pending requests is full.
+    '''
+    pass
+
+
+class LiftOverServiceError(Exception):
+    '''
+    Raised by :class:`LiftOverClient` when the service responds with an error.
+    The HTTP status code is available as the ``status`` attribute.
+    '''
+    def __init__(self, status, message):
+        Exception.__init__(self, "%d: %s" % (status, message))
+        self.status = status
+
+
+class _Request:
+    __slots__ = ['points', 'regions', 'results', 'error', 'done']
+
+    def __init__(self, points, regions):
+        self.points = points
+        self.regions = regions
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchConverter:
+    '''
+    Coalesces concurrently submitted conversion requests into micro-batches for a single LiftOver object.
+
+    A worker thread takes the first pending request and then keeps collecting further ones until either
+    max_batch point queries have been gathered or max_delay seconds have passed. All the collected point
+    queries are then converted with a single :meth:`pyliftover.liftover.LiftOver.convert_many` call.
+    At most max_queue requests may be waiting for the worker; further submissions fail with :class:`Overloaded`.
+    '''
+
+    def __init__(self, lo, max_batch=4096, max_delay=0.002, max_queue=1024):
+        self.lo = lo
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='pyliftover-batcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def pending(self):
+        '''
+        The (approximate) number of requests waiting for the worker.
+        '''
+        return self._queue.qsize()
+
+    def submit(self, points=(), regions=(), timeout=None):
+        '''
+        Converts a list of (chromosome, position[, strand]) point queries and a list of (chromosome, start, end[, strand]) regions.
+        Blocks until the results are ready and returns them as a pair of lists.
+        Raises :class:`Overloaded` if the queue is full.
+        '''
+        request = _Request(points, regions)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise Overloaded("Too many pending requests")
+        if not request.done.wait(timeout):
+            raise Overloaded("Timed out waiting for the conversion")
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def _run(self):
+        stop = False
+        while not stop:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            size = len(request.points)
+            deadline = time.time() + self.max_delay
+            while size < self.max_batch:
+                remaining = deadline - time.time()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True  # Finish this batch first, then stop
+                    break
+                batch.append(request)
+                size += len(request.points)
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            points = [q for request in batch for q in request.points]
+            results = self.lo.convert_many(points)
+        except Exception as e:
+            if len(batch) > 1:
+                # Retry the requests one by one, so that the error only reaches the request which caused it
+                for request in batch:
+                    self._process([request])
+                return
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        offset = 0
+        for request in batch:
+            n = len(request.points)
+            try:
+                region_results = [self.lo.convert_region(*r) for r in request.regions]
+                request.results = (results[offset:offset + n], region_results)
+            except Exception as e:
+                request.error = e
+            offset += n
+            request.done.set()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Enables keep-alive
+    server_version = 'pyliftover'
+
+    def setup(self):
+        # Headers and body are written separately, so Nagle's algorithm would stall every response on TCP
+        self.disable_nagle_algorithm = self.request.family != getattr(socket, 'AF_UNIX', None)
+        BaseHTTPRequestHandler.setup(self)
+
+    def address_string(self):
+        # For Unix sockets client_address is not a (host, port) pair
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _respond(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _batcher(self, name):
+        batchers = self.server.batchers
+        if name is None and len(batchers) == 1:
+            return next(iter(batchers.values()))
+        if name not in batchers:
+            raise ValueError("Unknown chain %r (available: %s)" % (name, ', '.join(sorted(batchers))))
+        return batchers[name]
+
+    def _handle(self, path, data):
+        if path == '/health':
+            return 200, {'status': 'ok', 'chains': sorted(self.server.batchers)}
+        if path == '/convert':
+            queries = [tuple(q) for q in data['queries']]
+            for q in queries:
+                if not (2 <= len(q) <= 3 and isinstance(q[0], str) and isinstance(q[1], int) and q[2:] in [(), ('+',), ('-',)]):
+                    raise ValueError("Invalid query: %r" % (q,))
+            points, _ = self._batcher(data.get('chain')).submit(queries, (), self.server.request_timeout)
+            return 200, {'results': points}
+        if path == '/convert_region':
+            regions = [tuple(r) for r in data['regions']]
+            for r in regions:
+                if not (3 <= len(r) <= 4 and isinstance(r[0], str) and isinstance(r[1], int) and isinstance(r[2], int) and r[3:] in [(), ('+',), ('-',)]):
+                    raise ValueError("Invalid region: %r" % (r,))
+            _, results = self._batcher(data.get('chain')).submit((), regions, self.server.request_timeout)
+            return 200, {'results': results}
+        return 404, {'error': "Unknown path %s" % path}
+
+    def _dispatch(self, path, data, single=False):
+        try:
+            status, response = self._handle(path, data)
+            if single and status == 200:
+                response = {'result': response['results'][0]}
+        except Overloaded as e:
+            status, response = 503, {'error': str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, response = 400, {'error': "Bad request: %s" % e}
+        self._respond(status, response)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/convert':
+            return self._dispatch(url.path, {})
+        params = dict((k, v[-1]) for (k, v) in parse_qs(url.query).items())
+        try:
+            data = {'queries': [(params['chrom'], int(params['pos']), params.get('strand', '+'))], 'chain': params.get('chain')}
+        except (KeyError, ValueError) as e:
+            return self._respond(400, {'error': "Bad request: %s" % e})
+        self._dispatch('/convert', data, single=True)
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
+        except ValueError as e:
+            return self._respond(400, {'error': "Bad request: %s" % e})
+        self._dispatch(urlsplit(self.path).path, data)
+
+
+class _ServerMixin:
+    daemon_threads = True
+    block_on_close = False
+
+    def start_batchers(self, liftovers, max_batch, max_delay, max_queue, timeout, quiet):
+        self.batchers = dict((name, BatchConverter(lo, max_batch, max_delay, max_queue)) for (name, lo) in liftovers.items())
+        self.request_timeout = timeout
+        self.quiet = quiet
+        for b in self.batchers.values():
+            b.start()
+
+    def server_close(self):
+        super(_ServerMixin, self).server_close()
+        for b in self.batchers.values():
+            b.stop()
+
+
+class LiftOverHTTPServer(_ServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class LiftOverUnixServer(_ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    def server_close(self):
+        _ServerMixin.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _remove_stale_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket, refusing to replace it", path)
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+    except OSError:
+        os.unlink(path)  # Nobody is listening
+    else:
+        raise OSError(errno.EADDRINUSE, "Another server is listening on the socket", path)
+    finally:
+        s.close()
+
+
+def make_server(liftovers, host='127.0.0.1', port=8765, unix_socket=None, max_batch=4096, max_delay=0.002, max_queue=1024, timeout=30, quiet=True):
+    '''
+    Creates (but does not start) the conversion server.
+    liftovers must be a dict: chain name --> LiftOver object. Requests refer to the chains by name
+    (the name may be omitted if there is just one chain).
+    If unix_socket is given, the server listens on that Unix domain socket instead of host:port.
+    A socket left over at that path by a server which is no longer running is replaced, but any other existing file is not:
+    FileExistsError is raised if it is not a socket, and OSError (EADDRINUSE) if a server is still listening on it.
+    See :class:`BatchConverter` for the meaning of max_batch, max_delay and max_queue.
+    Run the server with ``server.serve_forever()`` and stop it with ``server.shutdown(); server.server_close()``.
+    '''
+    if unix_socket is not None:
+        _remove_stale_socket(unix_socket)
+        server = LiftOverUnixServer(unix_socket, _RequestHandler)
+    else:
+        server = LiftOverHTTPServer((host, port), _RequestHandler)
+    server.start_batchers(liftovers, max_batch, max_delay, max_queue, timeout, quiet)
+    return server
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path, timeout):
+        HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.unix_socket = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+class LiftOverClient:
+    '''
+    Client for the conversion service (see :func:`make_server`).
+    Keeps a pool of up to pool_size persistent (keep-alive) connections and may be shared by several threads.
+    The results have the same form as those of the corresponding :class:`pyliftover.liftover.LiftOver` methods.
+    '''
+
+    def __init__(self, host='127.0.0.1', port=8765, unix_socket=None, chain=None, pool_size=8, timeout=60):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.chain = chain
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(pool_size)
+
+    def _connection(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            if self.unix_socket is not None:
+                return _UnixHTTPConnection(self.unix_socket, self.timeout)
+            return HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(self, method, path, data=None):
+        body = None if data is None else json.dumps(data).encode('utf-8')
+        headers = {} if body is None else {'Content-Type': 'application/json'}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except (OSError, IOError) as e:
+                conn.close()
+                # A pooled connection may have been closed by the server. Retry once with a fresh one.
+                if attempt == 0:
+                    continue
+                raise
+            self._release(conn)
+            result = json.loads(payload.decode('utf-8'))
+            if response.status != 200:
+                raise LiftOverServiceError(response.status, result.get('error', ''))
+            return result
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def convert_coordinate(self, chromosome, position, strand='+'):
+        params = {'chrom': chromosome, 'pos': position, 'strand': strand}
+        if self.chain is not None:
+            params['chain'] = self.chain
+        return self._to_tuples(self._request('GET', '/convert?' + urlencode(params))['result'])
+
+    def convert_many(self, queries):
+        data = {'queries': [list(q) for q in queries], 'chain': self.chain}
+        return [self._to_tuples(r) for r in self._request('POST', '/convert', data)['results']]
+
+    def convert_region(self, chromosome, start, end, strand='+'):
+        return self.convert_regions([(chromosome, start, end, strand)])[0]
+
+    def convert_regions(self, regions):
+        data = {'regions': [list(r) for r in regions], 'chain': self.chain}
+        return [self._to_tuples(r) for r in self._request('POST', '/convert_region', data)['results']]
+
+    @staticmethod
+    def _to_tuples(result):
+        return None if result is None else [tuple(r) for r in result]
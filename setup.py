@@ -52,5 +52,5 @@ setup(name='pyliftover',
       install_requires=[],
       tests_require=['pytest'],
       cmdclass={'test': PyTest},
-      entry_points=''
+      entry_points={'console_scripts': ['pyliftover = pyliftover.cli:main']}
       )
@@ -0,0 +1,55 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+asyncio facade test module.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import random
+import sys
+import pytest
+from pyliftover import LiftOver
+
+if sys.version_info < (3, 7):
+    pytest.skip("The asyncio facade requires Python 3.7+", allow_module_level=True)
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pyliftover.aio import AsyncLiftOver
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+CHAIN_FILE = os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz')
+
+
+def test_async_liftover():
+    lo = LiftOver(CHAIN_FILE)
+    random.seed(1)
+    queries = [(random.choice(['chr1', 'chr2', 'chrX']), random.randint(0, 150000000), random.choice('+-')) for i in range(50000)]
+    expected = lo.convert_many(queries)
+
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            alo = await AsyncLiftOver.create(CHAIN_FILE, executor=executor, chunk_size=1000)
+            assert await alo.aconvert('chr1', 1000000) == lo.convert_coordinate('chr1', 1000000)
+            assert await alo.aconvert('chrZ', 1) is None
+            assert await alo.aconvert_region('chr1', 1000000, 1000100) == lo.convert_region('chr1', 1000000, 1000100)
+            assert await alo.aconvert_many(queries[:10]) == expected[:10]
+            assert await alo.anearest_mapped_many(queries[:300]) == lo.nearest_mapped_many(queries[:300])
+
+            # While a large batch is being converted, other coroutines keep running
+            ticks = []
+            async def ticker():
+                while True:
+                    ticks.append(1)
+                    await asyncio.sleep(0)
+            task = asyncio.ensure_future(ticker())
+            result = await alo.aconvert_many(iter(queries))
+            task.cancel()
+            assert result == expected
+            assert len(ticks) >= len(queries) // alo.chunk_size
+
+    asyncio.run(run())
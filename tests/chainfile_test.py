@@ -9,6 +9,9 @@ Licensed under MIT license.
 '''
 import os
 import sys
+import gzip
+import shutil
+from tempfile import mkdtemp
 if sys.version_info < (3, 0):
     from cStringIO import StringIO
 else:
@@ -16,6 +19,8 @@ else:
 
 from pyliftover.chainfile import LiftOverChain, LiftOverChainFile, open_liftover_chain_file
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+
 # Examples from spec page: http://genome.ucsc.edu/goldenPath/help/chain.html
 example_1 = b'''
 chain 4900 chrY 58368225 + 25985403 25985638 chr5 151006098 - 43257292 43257528 1
@@ -100,4 +105,90 @@ def test_issue_1():
     testdata_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'mds42.to.mg1655.liftOver')
     with open(testdata_file, 'rb') as f:
         locf = LiftOverChainFile(f)
-        assert len(locf.chains) == 1
\ No newline at end of file
+        assert len(locf.chains) == 1
+
+def test_chromosome_ids_and_aliases():
+    data = example_1 + example_2
+    cf = LiftOverChainFile(StringIO(data))
+    assert list(cf.chromosomes) == ['chrY', 'chr5']
+    chrom_id = cf.chromosome_id('chrY')
+    assert chrom_id == 0
+    assert cf.chromosome_id(b'chrY') == chrom_id
+    assert cf.chromosome_id('chr5') is None  # Only present as a target
+    assert cf.chromosome_id('Y') is None
+    assert cf.query_id(chrom_id, 25985406) == cf.query('chrY', 25985406)
+    assert cf.chains[0].source_name is cf.chains[1].source_name
+
+    cf = LiftOverChainFile(StringIO(data), aliases=True)
+    assert cf.chromosome_id('Y') == chrom_id
+    assert cf.query('Y', 25985406) == cf.query('chrY', 25985406)
+    cf = LiftOverChainFile(StringIO(data), aliases={'NC_000024.10': 'chrY'})
+    assert cf.query('NC_000024.10', 25985406) == cf.query('chrY', 25985406)
+    assert cf.query('Y', 25985406) is None
+
+
+def test_chain_filters():
+    data = example_1 + example_2
+    assert len(LiftOverChainFile(StringIO(data), min_score=4900).chains) == 2
+    assert len(LiftOverChainFile(StringIO(data), min_score=4901).chains) == 0
+    assert len(LiftOverChainFile(StringIO(data), source_chromosomes=['chrY']).chains) == 2
+    assert len(LiftOverChainFile(StringIO(data), source_chromosomes='chr[0-9]+').chains) == 0
+    assert len(LiftOverChainFile(StringIO(data), target_chromosomes='chr5').chains) == 2
+    assert len(LiftOverChainFile(StringIO(data), target_chromosomes='chr').chains) == 0
+    # Unicode patterns (on Python 2) are regular expressions as well, not collections of characters
+    assert len(LiftOverChainFile(StringIO(data), source_chromosomes=u'chr[XY]').chains) == 2
+    # A string is a regular expression, names containing dots should be given as a collection
+    dotted = data.replace(b'chr5', b'NC_000005.10')
+    assert len(LiftOverChainFile(StringIO(dotted), target_chromosomes=['NC_000005X10']).chains) == 0
+    assert len(LiftOverChainFile(StringIO(dotted), target_chromosomes=['NC_000005.10']).chains) == 2
+
+    # Only the first block of chain 1 and no blocks of chain 2 overlap the region
+    cf = LiftOverChainFile(StringIO(data), regions=[('chrY', 25985400, 25985406)])
+    assert len(cf.chains) == 1
+    assert cf.chains[0].blocks == [(25985403, 25985403+9, 43257292)]
+    assert (cf.chains[0].source_start, cf.chains[0].source_end) == (25985403, 25985403+9)
+    assert (cf.chains[0].target_start, cf.chains[0].target_end) == (43257292, 43257292+9)
+    assert len(cf.query('chrY', 25985405)) == 1
+    assert len(cf.query('chrY', 25985406)) == 1
+    assert len(cf.query('chrY', 25985403+9+1)) == 0
+
+    # Regions from a BED file, given by a unicode name
+    tmp_dir = mkdtemp()
+    try:
+        bed_file = os.path.join(tmp_dir, 'regions.bed')
+        with open(bed_file, 'w') as f:
+            f.write('chrY\t25985400\t25985406\n')
+        assert len(LiftOverChainFile(StringIO(data), regions=u'%s' % bed_file).chains) == 1
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    # Within the regions, the filtered index gives the same results as the full one
+    regions = [('chr1', 1000000, 2000000), ('chr21', 0, 40000000)]
+    with gzip.open(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'), 'rb') as f:
+        full = LiftOverChainFile(f)
+    with gzip.open(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'), 'rb') as f:
+        subset = LiftOverChainFile(f, regions=regions)
+    assert 0 < len(subset.chains) < len(full.chains)
+    assert sorted(subset.chain_index.keys()) == ['chr1', 'chr21']
+    key = lambda hits: sorted((s, e, t, c.id) for (s, e, (t, c)) in hits)
+    for (chromosome, start, end) in regions:
+        for position in range(start, end, 997):
+            assert key(subset.query(chromosome, position)) == key(full.query(chromosome, position))
+
+
+def test_write_chains():
+    data = example_1 + example_2
+    cf = LiftOverChainFile(StringIO(data))
+    out = StringIO()
+    cf.write(out)
+    assert [ln.split() for ln in out.getvalue().split(b'\n') if ln] == [ln.split() for ln in data.split(b'\n') if ln]
+    cf2 = LiftOverChainFile(StringIO(out.getvalue()))
+    for c, c2 in zip(cf.chains, cf2.chains):
+        assert [getattr(c, a) for a in LiftOverChain.__slots__] == [getattr(c2, a) for a in LiftOverChain.__slots__]
+
+    # Trimmed chains are valid chains as well
+    cf = LiftOverChainFile(StringIO(data), regions=[('chrY', 25985420, 25985500)])
+    out = StringIO()
+    cf.write(out)
+    cf2 = LiftOverChainFile(StringIO(out.getvalue()))
+    assert [c.blocks for c in cf2.chains] == [c.blocks for c in cf.chains]
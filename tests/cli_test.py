@@ -0,0 +1,64 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Command-line interface test module.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import shutil
+from tempfile import mkdtemp
+from pyliftover import LiftOver
+from pyliftover.cli import main
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+CHAIN_FILE = os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz')
+
+
+def setup_module(module):
+    global tmp_dir
+    tmp_dir = mkdtemp()
+
+
+def teardown_module(module):
+    shutil.rmtree(tmp_dir)
+
+
+def test_subset():
+    regions = [('chr1', 1000000, 1100000), ('chr1', 103786000, 103787000), ('chrX', 50000000, 51000000)]
+    bed_file = os.path.join(tmp_dir, 'panel.bed')
+    with open(bed_file, 'w') as f:
+        for r in regions:
+            f.write('%s\t%d\t%d\n' % r)
+    output = os.path.join(tmp_dir, 'panel.over.chain.gz')
+    assert main(['subset', CHAIN_FILE, bed_file, output]) == 0
+
+    full = LiftOver(CHAIN_FILE)
+    subset = LiftOver(output)
+    assert 0 < len(subset.chain_file.chains) < len(full.chain_file.chains)
+    for (chromosome, start, end) in regions:
+        for position in list(range(start, end, 101)) + [end - 1]:
+            assert subset.convert_coordinate(chromosome, position) == full.convert_coordinate(chromosome, position)
+            assert subset.convert_coordinate(chromosome, position, '-') == full.convert_coordinate(chromosome, position, '-')
+    assert subset.convert_coordinate('chr2', 1000000) is None
+
+
+def test_info(capsys):
+    assert main(['info', CHAIN_FILE, '--top', '3']) == 0
+    lines = capsys.readouterr().out.strip().split('\n')
+    assert lines[0].split()[0] == 'chromosome'
+    assert len(lines) == 1 + 3 + 2
+    assert lines[-2].split()[:3] == ['TOTAL', str(len(LiftOver(CHAIN_FILE).chain_file.chains)), '10633']
+
+
+def test_mask():
+    from pyliftover.regions import read_bed, RegionSet
+    output = os.path.join(tmp_dir, 'multi.bed.gz')
+    assert main(['mask', CHAIN_FILE, output, '--classes', 'multi,unique']) == 0
+    regions = read_bed(output)
+    lo = LiftOver(CHAIN_FILE)
+    expected = RegionSet(('chr1', s, e) for (s, e, c) in lo.mappability_runs('chr1') if c != 0)
+    assert regions.regions('chr1') == expected.regions('chr1')
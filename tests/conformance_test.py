@@ -0,0 +1,275 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Engine conformance and performance-regression test.
+
+All the lookup engines (the IntervalTree chain index and the alternative indexes) and all the query APIs
+are run on the same randomized and edge-case positions (block starts/ends +-1, chromosome ends)
+and must give identical results.
+
+The performance part measures conversion throughput and index memory on the hg17ToHg18 chain file
+and compares them to the baseline stored in data/perf_baseline.json. As absolute throughput depends on the machine,
+it is compared as the speedup of each API over convert_coordinate with the default IntervalTree index, measured in the same run.
+The test fails if a speedup drops below the baseline one times "min_speedup_ratio", or memory grows above the baseline times
+"max_memory_ratio". Memory is compared relative to the IntervalTree index and, if the interpreter is the one
+recorded with the baseline (as sys.getsizeof differs between Python versions), also in absolute bytes.
+Set the environment variable PYLIFTOVER_SKIP_PERF=1 to skip it (e.g. on a slow or busy machine),
+or PYLIFTOVER_UPDATE_PERF_BASELINE=1 to record the current measurements as the new baseline.
+The test fails if there is no baseline.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import gzip
+import json
+import os
+import pickle
+import platform
+import random
+import struct
+import sys
+import time
+from io import BytesIO
+import pytest
+from pyliftover import LiftOver
+from pyliftover.chainfile import LiftOverChainFile
+from pyliftover.flatindex import BinnedIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+CHAIN_FILE = os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz')
+BASELINE_FILE = os.path.join(DATA_DIR, 'perf_baseline.json')
+
+
+# Overlapping chains (on both strands, with equal and different scores), to exercise multiple hits
+OVERLAPPING_CHAINS = b'''
+chain 4900 chrY 58368225 + 25985403 25985638 chr5 151006098 - 43257292 43257528 1
+9 1 0
+10 0 5
+61 4 0
+16 0 4
+42 3 0
+16 0 8
+14 1 0
+3 7 0
+48
+
+chain 4900 chrY 58368225 + 25985406 25985566 chr5 151006098 - 43549808 43549970 2
+16 0 2
+60 4 0
+10 0 4
+70
+
+chain 5000 chrY 58368225 + 25985400 25985600 chr7 159138663 + 1000 1210 3
+50 0 10
+150
+
+chain 100 chrY 58368225 + 0 100 chrY 58368225 + 58368125 58368225 4
+100
+'''
+
+
+def setup_module(module):
+    global datasets, lo
+    lo = LiftOver(CHAIN_FILE)
+    datasets = [lo, LiftOver(BytesIO(OVERLAPPING_CHAINS))]
+
+
+def serialize(chain_file):
+    f = BytesIO()
+    chain_file.write(f)
+    return f.getvalue()
+
+
+def engines(chain_file):
+    '''
+    Also loads the chain file with each of the non-default index types.
+    Returns a dict: engine name --> function (chromosome, position) --> list of (source_from, source_to, target_from, chain) hits or None.
+    '''
+    chains_bytes = serialize(chain_file)
+    def by_id(query_id):
+        def query(chromosome, position):
+            chrom_id = chain_file.chromosomes.resolve(chromosome)
+            return None if chrom_id is None else query_id(chrom_id, position)
+        return query
+    return {
+        'tree': chain_file.query,
+        'tree_id': by_id(chain_file.query_id),
+        'flat': by_id(chain_file.block_index('flat').query),
+        'binned': by_id(chain_file.block_index('binned').query),
+        'binned_small_bins': by_id(BinnedIndex(chain_file, bin_bits=9).query),
+        'index=flat': LiftOverChainFile(BytesIO(chains_bytes), index='flat').query,
+        'index=binned': LiftOverChainFile(BytesIO(chains_bytes), index='binned').query,
+    }
+
+
+def conversion_apis(lo):
+    '''
+    Returns a dict: API name --> function (list of (chromosome, position, strand) queries) --> list of results.
+    '''
+    unpickled = pickle.loads(pickle.dumps(lo, protocol=2))
+    unpickled_binned = pickle.loads(pickle.dumps(LiftOver(BytesIO(serialize(lo.chain_file)), index='binned'), protocol=2))
+    def by_id(queries):
+        ids = [lo.chromosome_id(q[0]) for q in queries]
+        return [None if chrom_id is None else lo.convert_coordinate_id(chrom_id, q[1], q[2]) for (chrom_id, q) in zip(ids, queries)]
+    return {
+        'convert_coordinate': lambda queries: [lo.convert_coordinate(*q) for q in queries],
+        'convert_coordinate_id': by_id,
+        'convert_many': lambda queries: lo.convert_many(queries),
+        'convert_many_threads': lambda queries: lo.convert_many(queries, threads=4, chunk_size=500),
+        'unpickled': lambda queries: [unpickled.convert_coordinate(*q) for q in queries],
+        'unpickled_binned': lambda queries: [unpickled_binned.convert_coordinate(*q) for q in queries],
+    }
+
+
+def sample_positions(lo, n_random=3000, n_blocks=2000, seed=1):
+    '''
+    Returns a list of (chromosome, position) pairs: edge cases around randomly chosen blocks and chromosome ends, and random positions.
+    '''
+    rnd = random.Random(seed)
+    chains = lo.chain_file.chains
+    positions = []
+    for i in range(n_blocks):
+        c = rnd.choice(chains)
+        (sfrom, sto, tfrom) = rnd.choice(c.blocks)
+        positions.extend((c.source_name, p) for p in [sfrom - 1, sfrom, sfrom + 1, sto - 1, sto, sto + 1])
+    sizes = dict((c.source_name, c.source_size) for c in chains)
+    for (chromosome, size) in sizes.items():
+        positions.extend((chromosome, p) for p in [-1, 0, 1, size - 1, size, size + 1])
+    names = sorted(sizes)
+    positions.extend((name, rnd.randint(0, sizes[name])) for name in [rnd.choice(names) for i in range(n_random)])
+    positions.extend([('chrZ', 100), (b'chr1', 1000000)])
+    return positions
+
+
+def canonical_hits(hits):
+    return None if hits is None else sorted((s, e, t, c.id, c.score) for (s, e, (t, c)) in hits)
+
+
+def canonical_results(results):
+    '''
+    Multiple conversions must be sorted by decreasing score; the order of equally-scored ones is not prescribed.
+    '''
+    if results is None:
+        return None
+    assert [r[3] for r in results] == sorted([r[3] for r in results], reverse=True)
+    return sorted(results, key=lambda r: (-r[3], r))
+
+
+def test_engines_conform():
+    for lo in datasets:
+        positions = sample_positions(lo)
+        reference = [canonical_hits(lo.chain_file.query(*p)) for p in positions]
+        assert sum(1 for hits in reference if hits) > 1000
+        for (name, query) in engines(lo.chain_file).items():
+            for (p, expected) in zip(positions, reference):
+                assert canonical_hits(query(*p)) == expected, (name, p)
+    assert any(hits and len(hits) > 2 for hits in reference)
+
+
+def test_conversion_apis_conform():
+    for lo in datasets:
+        queries = [(chromosome, position, strand) for (chromosome, position) in sample_positions(lo) for strand in '+-']
+        reference = [canonical_results(r) for r in [lo.convert_coordinate(*q) for q in queries]]
+        assert any(r and r[0][2] == '-' for r in reference)
+        for (name, convert) in conversion_apis(lo).items():
+            for (q, expected, result) in zip(queries, reference, convert(queries)):
+                assert canonical_results(result) == expected, (name, q)
+
+
+def test_mappability_conforms():
+    '''
+    The mappability mask classifies each position by the number of its conversions, capped at 2.
+    '''
+    for lo in datasets:
+        positions = sample_positions(lo)
+        for p in positions:
+            result = lo.convert_coordinate(*p)
+            assert lo.mappability(*p) == (None if result is None else min(len(result), 2)), p
+        rnd = random.Random(2)
+        for (chromosome, position) in positions[::50]:
+            start, end = position - rnd.randint(0, 5000), position + rnd.randint(1, 5000)
+            runs = lo.mappability_runs(chromosome, start, end)
+            if runs is None:
+                continue
+            assert runs[0][0] == start and runs[-1][1] == end
+            assert all(runs[i][1] == runs[i + 1][0] and runs[i][2] != runs[i + 1][2] for i in range(len(runs) - 1))
+            for (run_start, run_end, cls) in runs:
+                assert lo.mappability(chromosome, run_start) == lo.mappability(chromosome, run_end - 1) == cls
+
+
+def test_conversion_apis_testpoints():
+    '''
+    All APIs reproduce the reference UCSC conversions of the hg17ToHg18 test points (see liftover_test.test_liftover).
+    '''
+    f = gzip.open(os.path.join(DATA_DIR, 'hg17ToHg18.testpoints.txt.gz'))
+    points = [ln.decode('ascii').split('\t') for ln in f]
+    f.close()
+    queries = [(s_chr, int(s_pos), '+') for (s_chr, s_pos, t_chr, t_pos) in points]
+    expected = [[] if t_chr == '-' else [(t_chr, int(t_pos))] for (s_chr, s_pos, t_chr, t_pos) in points]
+    for (name, convert) in conversion_apis(lo).items():
+        assert [[r[:2] for r in result] for result in convert(queries)] == expected, name
+
+
+def interpreter():
+    return '%s %d.%d %d-bit' % (platform.python_implementation(), sys.version_info[0], sys.version_info[1], struct.calcsize('P') * 8)
+
+
+def measure_performance(lo):
+    rnd = random.Random(1)
+    chains = lo.chain_file.chains
+    queries = []
+    for i in range(20000):
+        c = rnd.choice(chains)
+        queries.append((c.source_name, rnd.randint(c.source_start, c.source_end), '+'))
+    def duration(f):
+        best = float('inf')
+        for i in range(3):
+            t = time.time()
+            f()
+            best = min(best, time.time() - t)
+        return best
+    lo_binned = LiftOver(CHAIN_FILE, index='binned')
+    fresh = LiftOver(CHAIN_FILE)
+    memory = {'tree': fresh.memory_usage()}
+    fresh.chain_file.block_index('flat')
+    memory['tree+flat'] = fresh.memory_usage()
+    fresh.chain_file.block_index('binned')
+    memory['tree+flat+binned'] = fresh.memory_usage()
+    reference = duration(lambda: [lo.convert_coordinate(*q) for q in queries])
+    return {
+        'interpreter': interpreter(),
+        'speedup': {  # Over convert_coordinate with the IntervalTree index
+            'convert_many': reference / duration(lambda: lo.convert_many(queries)),
+            'convert_coordinate(index=binned)': reference / duration(lambda: [lo_binned.convert_coordinate(*q) for q in queries]),
+        },
+        'memory_bytes': memory,
+    }
+
+
+@pytest.mark.skipif(os.environ.get('PYLIFTOVER_SKIP_PERF') == '1', reason="PYLIFTOVER_SKIP_PERF=1")
+def test_performance_baseline():
+    measured = measure_performance(lo)
+    if os.environ.get('PYLIFTOVER_UPDATE_PERF_BASELINE') == '1':
+        baseline = {'min_speedup_ratio': 0.6, 'max_memory_ratio': 1.25}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as f:
+                baseline.update((k, v) for (k, v) in json.load(f).items() if k in baseline)
+        baseline.update(measured)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        return
+    assert os.path.exists(BASELINE_FILE), "No performance baseline, record one with PYLIFTOVER_UPDATE_PERF_BASELINE=1"
+    with open(BASELINE_FILE) as f:
+        baseline = json.load(f)
+    for (api, speedup) in baseline['speedup'].items():
+        assert measured['speedup'][api] >= speedup * baseline['min_speedup_ratio'], \
+            "%s throughput regressed: %.2fx vs baseline %.2fx of convert_coordinate" % (api, measured['speedup'][api], speedup)
+    tree, baseline_tree = measured['memory_bytes']['tree'], baseline['memory_bytes']['tree']
+    for (index, size) in baseline['memory_bytes'].items():
+        assert measured['memory_bytes'][index] / float(tree) <= size / float(baseline_tree) * baseline['max_memory_ratio'], \
+            "%s memory regressed: %.2fx vs baseline %.2fx of the IntervalTree index" % (index, measured['memory_bytes'][index] / float(tree), size / float(baseline_tree))
+        if measured['interpreter'] == baseline['interpreter']:
+            assert measured['memory_bytes'][index] <= size * baseline['max_memory_ratio'], \
+                "%s memory regressed: %d bytes vs baseline %d" % (index, measured['memory_bytes'][index], size)
@@ -0,0 +1,106 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+FlatIndex and batch conversion test module.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import random
+import pytest
+from pyliftover import LiftOver, liftover
+from pyliftover.flatindex import FlatIndex, BinnedIndex
+from pyliftover.intervaltree import IntervalTree
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+
+
+class _FakeChainFile:
+    '''
+    Just enough of LiftOverChainFile to build a FlatIndex from a list of intervals.
+    '''
+    class _Chain:
+        source_name = 'chr1'
+        score = 0
+
+    def __init__(self, intervals):
+        from pyliftover.chromosomes import ChromosomeDictionary
+        self.chromosomes = ChromosomeDictionary()
+        self.chromosomes.add('chr1')
+        self.chains = []
+        for (a, b) in intervals:
+            c = self._Chain()
+            c.blocks = [(a, b, 0)]
+            self.chains.append(c)
+
+
+def test_flat_index():
+    random.seed(1)
+    intervals = [(10, 20), (20, 30), (21, 31), (30, 40), (40, 50), (45, 55), (45, 56), (46, 57), (55, 56), (58, 59), (50, 51), (0, 100), (5, 5)]
+    intervals += [(a, a + random.randint(1, 30)) for a in [random.randint(0, 1000) for i in range(300)]]
+    for index in [FlatIndex(_FakeChainFile(intervals)), BinnedIndex(_FakeChainFile(intervals), bin_bits=3), BinnedIndex(_FakeChainFile(intervals))]:
+        assert len(index) == len([i for i in intervals if i[0] < i[1]])
+        for x in range(-1, 1100):
+            result = [(a, b) for (a, b, data) in index.query(0, x)]
+            assert result == sorted(result, key=lambda i: i[0])
+            assert sorted(result) == sorted((a, b) for (a, b) in intervals if a <= x < b)
+
+
+def test_convert_many(monkeypatch):
+    lo = LiftOver(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'))
+    random.seed(1)
+    queries = [(random.choice(['chr1', 'chr2', 'chrX', b'chr7', 'chrZ']), random.randint(0, 200000000), random.choice('+-')) for i in range(20000)]
+    key = lambda result: result if result is None else sorted(result)
+    expected = [key(lo.convert_coordinate(*q)) for q in queries]
+    assert [key(r) for r in lo.convert_many(queries)] == expected
+    assert [key(r) for r in lo.convert_many(iter(queries), threads=4, chunk_size=1000)] == expected
+    # The thread pool is only used when the GIL is disabled
+    monkeypatch.setattr(liftover, '_gil_enabled', lambda: False)
+    assert [key(r) for r in lo.convert_many(iter(queries), threads=4, chunk_size=1000)] == expected
+    assert lo.convert_many([]) == []
+
+
+def test_nearest():
+    random.seed(1)
+    intervals = [(a, a + random.randint(1, 30)) for a in [random.randint(0, 1000) for i in range(100)]]
+    index = FlatIndex(_FakeChainFile(intervals))
+    for x in range(-1, 1100):
+        upstream, downstream = index.nearest(0, x)
+        ends = [b for (a, b) in intervals if b <= x]
+        starts = [a for (a, b) in intervals if a > x]
+        assert (upstream[1] if upstream else None) == (max(ends) if ends else None)
+        assert (downstream[0] if downstream else None) == (min(starts) if starts else None)
+
+
+def test_nearest_mapped():
+    lo = LiftOver(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'))
+    chains = lo.chain_file.chains
+    random.seed(1)
+    queries = [('chr1', random.randint(0, 250000000), random.choice('+-')) for i in range(300)] + [('chrZ', 1)]
+    results = lo.nearest_mapped_many(queries)
+    assert results[-1] is None
+    for (q, result) in zip(queries[:-1], results[:-1]):
+        assert result == lo.nearest_mapped(*q)
+        chromosome, position, strand = q
+        # Compare with a full scan over all blocks
+        blocks = [(b, c) for c in chains if c.source_name == chromosome for b in c.blocks]
+        upstream = [b[1] - 1 for (b, c) in blocks if b[1] <= position]
+        downstream = [b[0] for (b, c) in blocks if b[0] > position]
+        for (side, candidates) in zip(result, [max(upstream or [None]), min(downstream or [None])]):
+            if candidates is None:
+                assert side is None
+            else:
+                assert side[0] == candidates and side[-1] == abs(position - candidates)
+                assert side[1:5] in [r[:4] for r in lo.convert_coordinate(chromosome, side[0], strand)]
+
+
+def test_block_index_types():
+    cf = LiftOver(os.path.join(DATA_DIR, 'mds42.to.mg1655.liftOver')).chain_file
+    assert type(cf.block_index()) is FlatIndex and type(cf.block_index('binned')) is BinnedIndex
+    assert cf.block_index('flat') is cf.block_index()
+    for index_type in ['tree', 'nonexistent']:
+        with pytest.raises(ValueError):
+            cf.block_index(index_type)
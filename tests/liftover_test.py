@@ -90,3 +90,62 @@ def test_issue_2_3_4():
             assert len(res) == 0
         else:
             assert len(res) == 1 and res[0][0:3] == test_output[k]
+
+
+def test_pickle():
+    '''
+    Check that a pickled-and-unpickled LiftOver gives the same results as the original.
+    '''
+    import pickle
+    lo = LiftOver(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'), aliases={'one': 'chr1'})
+    # Protocol 2 and the interpreter's default one (which is 0 on Python 2)
+    for lo2 in [pickle.loads(pickle.dumps(lo, protocol=2)), pickle.loads(pickle.dumps(lo))]:
+        assert len(lo2.chain_file.chains) == len(lo.chain_file.chains)
+        assert list(lo2.chain_file.chromosomes) == list(lo.chain_file.chromosomes)
+        for c, c2 in zip(lo.chain_file.chains, lo2.chain_file.chains):
+            assert (c.score, c.source_name, c.target_name, c.target_strand, c.target_size, c.id, c.blocks) == \
+                   (c2.score, c2.source_name, c2.target_name, c2.target_strand, c2.target_size, c2.id, c2.blocks)
+        for position in range(0, 250000000, 99991):
+            for chromosome in ['chr1', 'chr7', 'chrX', 'one']:
+                assert lo2.convert_coordinate(chromosome, position) == lo.convert_coordinate(chromosome, position)
+
+
+def test_describe():
+    lo = LiftOver(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'))
+    d = lo.describe()
+    assert sorted(d['chromosomes']) == sorted(lo.chain_file.chain_index)
+    assert d['total']['chains'] == len(lo.chain_file.chains)
+    assert d['total']['blocks'] == sum(len(c.blocks) for c in lo.chain_file.chains)
+    assert d['total']['mid_entries'] == d['total']['duplicated_mid_entries']
+    assert d['total']['tree_nodes'] == sum(t.describe()['nodes'] for t in lo.chain_file.chain_index.values())
+    assert 0 < sum(s['bytes'] for s in d['chromosomes'].values()) <= d['total']['bytes'] == lo.memory_usage()
+    # Building an extra index shows up in the total
+    before = lo.memory_usage()
+    lo.convert_many([('chr1', 1)])
+    assert lo.memory_usage() > before
+
+
+def test_mappability_mask():
+    import pickle
+    from io import BytesIO
+    from pyliftover.regions import read_bed
+    lo = LiftOver(os.path.join(DATA_DIR, 'mds42.to.mg1655.liftOver'))
+    assert lo.mappability('chrZ', 1) is None and lo.mappability_runs('chrZ') is None
+    runs = lo.mappability_runs('AP012306.1')
+    assert (runs[0][0], runs[-1][1]) == (0, lo.chain_file.chains[0].source_size)
+    assert lo.mappability_runs('AP012306.1', -10, 5) == [(-10, 0, 0), (0, 5, 1)]
+
+    # BED export
+    f = BytesIO()
+    lo.write_mappability_bed(f, classes=(0,))
+    f.seek(0)
+    unmapped = read_bed(f)
+    assert unmapped.regions('AP012306.1') == [(s, e) for (s, e, c) in runs if c == 0]
+
+    # The mask is built once and travels along with the pickled chain file
+    mask = lo.chain_file.mappability_mask()
+    assert lo.chain_file.mappability_mask() is mask
+    for protocol in [0, 2]:
+        lo2 = pickle.loads(pickle.dumps(lo, protocol=protocol))
+        assert lo2.chain_file._mask is not None
+        assert lo2.mappability_runs('AP012306.1') == runs
@@ -0,0 +1,183 @@
+'''
+Pure-python implementation of UCSC "liftover" genome coordinate conversion.
+Conversion service test module. Runs the server on localhost.
+
+Copyright 2013, Konstantin Tretyakov.
+http://kt.era.ee/
+
+Licensed under MIT license.
+'''
+
+import os
+import random
+import shutil
+import socket
+import sys
+import threading
+import time
+from tempfile import mkdtemp
+import pytest
+from pyliftover import LiftOver
+
+if sys.version_info < (3, 7):
+    pytest.skip("The conversion service requires Python 3.7+", allow_module_level=True)
+
+from pyliftover.server import make_server, LiftOverClient, LiftOverServiceError, BatchConverter, Overloaded
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+
+
+def setup_module(module):
+    global lo, lo2
+    lo = LiftOver(os.path.join(DATA_DIR, 'hg17ToHg18.over.chain.gz'))
+    lo2 = LiftOver(os.path.join(DATA_DIR, 'mds42.to.mg1655.liftOver'))
+
+
+def run_server(**kwargs):
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def test_server():
+    server = run_server(liftovers={'hg17ToHg18': lo, 'mds42': lo2}, port=0)
+    try:
+        port = server.server_address[1]
+        client = LiftOverClient(port=port, chain='hg17ToHg18', pool_size=4)
+        assert client.health() == {'status': 'ok', 'chains': ['hg17ToHg18', 'mds42']}
+        assert client.convert_coordinate('chr1', 1000000) == lo.convert_coordinate('chr1', 1000000)
+        assert client.convert_coordinate('chr1', 103786443, '-') == lo.convert_coordinate('chr1', 103786443, '-')
+        assert client.convert_coordinate('chrZ', 1) is None
+        assert client.convert_region('chr1', 1000000, 1000100) == lo.convert_region('chr1', 1000000, 1000100)
+        assert LiftOverClient(port=port, chain='mds42').convert_coordinate('AP012306.1', 16000) == lo2.convert_coordinate('AP012306.1', 16000)
+
+        random.seed(1)
+        queries = [(random.choice(['chr1', 'chr2', 'chrX']), random.randint(0, 150000000), random.choice('+-')) for i in range(2000)]
+        expected = [lo.convert_coordinate(*q) for q in queries]
+        assert client.convert_many(queries) == expected
+
+        # Many concurrent small requests from several threads, sharing the connection pool
+        errors = []
+        def worker(part):
+            try:
+                for i in range(part, len(queries), 8):
+                    assert client.convert_coordinate(*queries[i]) == expected[i]
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+
+        for bad_call in [lambda: LiftOverClient(port=port).convert_coordinate('chr1', 1),  # Chain not specified
+                         lambda: client._request('POST', '/convert', {'queries': [['chr1']]}),
+                         lambda: client._request('POST', '/convert', {'queries': [[['x'], 5]]}),
+                         lambda: client._request('POST', '/convert', {'queries': [['chr1', 5, '*']]}),
+                         lambda: client._request('POST', '/convert_region', {'regions': [[1, 5, 10]]}),
+                         lambda: client._request('POST', '/convert_region', {'regions': [['chr1', 5, 10, '*']]}),
+                         lambda: client._request('GET', '/nonexistent')]:
+            with pytest.raises(LiftOverServiceError):
+                bad_call()
+        client.close()
+    finally:
+        stop_server(server)
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets not supported")
+def test_unix_socket_server():
+    tmp_dir = mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'pyliftover.sock')
+        server = run_server(liftovers={'hg17ToHg18': lo}, unix_socket=path)
+        try:
+            client = LiftOverClient(unix_socket=path)
+            assert client.convert_coordinate('chr1', 1000000) == lo.convert_coordinate('chr1', 1000000)
+            assert client.convert_regions([('chr1', 1000000, 1000100, '-')]) == [lo.convert_region('chr1', 1000000, 1000100, '-')]
+        finally:
+            stop_server(server)
+        assert not os.path.exists(path)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets not supported")
+def test_unix_socket_existing_path():
+    tmp_dir = mkdtemp()
+    try:
+        # An ordinary file is never replaced
+        path = os.path.join(tmp_dir, 'important.txt')
+        with open(path, 'w') as f:
+            f.write('data')
+        with pytest.raises(FileExistsError):
+            make_server(liftovers={'hg17ToHg18': lo}, unix_socket=path)
+        with open(path) as f:
+            assert f.read() == 'data'
+
+        # Neither is the socket of a running server
+        path = os.path.join(tmp_dir, 'pyliftover.sock')
+        server = run_server(liftovers={'hg17ToHg18': lo}, unix_socket=path)
+        try:
+            with pytest.raises(OSError):
+                make_server(liftovers={'hg17ToHg18': lo}, unix_socket=path)
+            assert LiftOverClient(unix_socket=path).convert_coordinate('chr1', 1000000) == lo.convert_coordinate('chr1', 1000000)
+        finally:
+            stop_server(server)
+
+        # A stale socket, whose server is gone, is replaced
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        server = run_server(liftovers={'hg17ToHg18': lo}, unix_socket=path)
+        try:
+            assert LiftOverClient(unix_socket=path).convert_coordinate('chr1', 1000000) == lo.convert_coordinate('chr1', 1000000)
+        finally:
+            stop_server(server)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_batch_converter_backpressure():
+    batcher = BatchConverter(lo, max_queue=1)
+    # The worker is not started, so the first request stays in the queue, and the next one is rejected
+    results = []
+    t = threading.Thread(target=lambda: results.append(batcher.submit([('chr1', 1000000)])))
+    t.start()
+    while batcher.pending() == 0:
+        time.sleep(0.001)
+    with pytest.raises(Overloaded):
+        batcher.submit([('chr1', 1000000)])
+    batcher.start()
+    t.join()
+    batcher.stop()
+    assert results == [([lo.convert_coordinate('chr1', 1000000)], [])]
+
+
+def test_batch_converter_error_isolation():
+    batcher = BatchConverter(lo)
+    # The worker is not started, so that both requests end up in the same batch
+    results, errors = [], []
+    def submit(points):
+        try:
+            results.append(batcher.submit(points))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=submit, args=(points,)) for points in [[(['x'], 5)], [('chr1', 1000000)]]]
+    for t in threads:
+        t.start()
+    while batcher.pending() < 2:
+        time.sleep(0.001)
+    batcher.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+    assert results == [([lo.convert_coordinate('chr1', 1000000)], [])]
+    assert len(errors) == 1 and isinstance(errors[0], TypeError)